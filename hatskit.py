@@ -1,14 +1,21 @@
 import os
 import json
 import shutil
+import sqlite3
 import time
 import argparse
 import sys
 import zipfile
-import glob
+import ntpath
 import subprocess
 import hashlib
+import struct
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from fnmatch import fnmatch
 import copy
 
@@ -28,6 +35,8 @@ for package in REQUIRED_PACKAGES:
 
 # --- Third-Party Imports ---
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import questionary
 from questionary import Style
 from rich.console import Console
@@ -60,19 +69,69 @@ SKELETON_FILE = 'skeleton.zip'
 CONFIG_FILE = 'config.json'
 CACHE_FILE = 'hatskit_cache.json'
 LAST_BUILD_FILE = 'last_build.json'
-DOWNLOAD_DIR = 'temp_downloads'
+STATE_DB_FILE = 'hatskit.db'
+STATE_DB_TIMEOUT = 30
+ASSET_STORE_DIR = 'asset_store'
+ASSET_STORE_INDEX = 'index.json'
+ASSET_STORE_MAX_MB = 2048
+ASSET_EVICT_GRACE_SECONDS = 3600
+ARCHIVE_INDEX_SUFFIX = '.index.json'
+ARCHIVE_INDEX_VERSION = 2
 BUILD_DIR = 'build'
 OUTPUT_FILENAME_BASE = 'HATS'
+HEKATE_INI_PATH = 'bootloader/hekate_ipl.ini'
 CACHE_DURATION = timedelta(hours=12)
+CACHE_KEY_PREFIXES = ('releases:', 'direct:')
+FETCH_WORKERS = 8
+GITHUB_GRAPHQL_URL = 'https://api.github.com/graphql'
+GRAPHQL_BATCH_SIZE = 25
+DOWNLOAD_WORKERS = 4
+DOWNLOAD_ATTEMPTS = 3
+DOWNLOAD_CHUNK_MIN = 64 * 1024
+DOWNLOAD_CHUNK_MAX = 1024 * 1024
+DOWNLOAD_LOCK_STALE_SECONDS = 3600
+DOWNLOAD_VALIDATOR_SUFFIX = '.validator'
+COMPRESSION_LEVEL = 6
+REPRODUCIBLE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+HTTP_POOL_HOSTS = 8
+HTTP_POOL_SIZE = 16
+HTTP_CONNECT_TIMEOUT = 10
+HTTP_READ_TIMEOUT = 60
+HTTP_RETRIES = 3
+RATE_LIMIT_RESERVE = 0
 
 # --- Global Variables ---
 github_pat = None
 config = None
+cache_lock = threading.Lock()
+listing_requests = {}
+asset_store_lock = threading.Lock()
+state_snapshot = {}
+state_snapshot_lock = threading.Lock()
+http_session = None
+http_session_lock = threading.Lock()
+rate_limits = {}
+rate_limit_lock = threading.Lock()
+listing_report = {}
+archive_indexes = {}
+archive_index_lock = threading.Lock()
 
 # --- Argument Parser ---
 parser = argparse.ArgumentParser(description=f"HATSKit v{VERSION}")
 parser.add_argument("--clear-cache", action="store_true", help="Clear the cache to force API refresh")
+parser.add_argument("--graphql", action="store_true", help="Resolve all release metadata with batched GitHub GraphQL queries (requires a PAT)")
+parser.add_argument("--offline", action="store_true", help="Build only from cached release metadata and the local asset store, without any network access")
+parser.add_argument("--prefetch", nargs="?", const="", metavar="IDS", help="Download assets into the asset store for later --offline builds and exit. IDS is a comma-separated list of component ids or 'all' (default: default components plus the last build)")
+parser.add_argument("--workers", type=int, help=f"Number of parallel asset downloads (default: {DOWNLOAD_WORKERS})")
+parser.add_argument("--incremental", action="store_true", help="Keep the build directory and only rewrite the files that changed since the last build")
+parser.add_argument("--zip-workers", type=int, help="Number of threads used to compress the final pack (default: all cores)")
+parser.add_argument("--compression-level", type=int, choices=range(0, 10), metavar="0-9", help=f"Deflate level for the final pack (default: {COMPRESSION_LEVEL})")
+parser.add_argument("--reproducible", action="store_true", help="Write a byte-identical pack for identical inputs (sorted entries, fixed timestamps and permissions)")
+parser.add_argument("--skip-unchanged", action="store_true", help="Skip the build without asking when its fingerprint matches the last build")
+parser.add_argument("--assembly", choices=["stream", "staged"], help="Stream the pack straight from the source archives (default) or extract it to the build directory first")
 args = parser.parse_args()
+if args.offline and (args.clear_cache or args.prefetch is not None):
+    parser.error("--offline cannot be combined with --clear-cache or --prefetch")
 
 # --- Language and Config Handling ---
 translations = {}
@@ -110,9 +169,11 @@ def load_config():
 
 def save_config(config):
     config_path = os.path.join(get_base_path(), CONFIG_FILE)
+    temp_path = f"{config_path}.{os.getpid()}.tmp"
     try:
-        with open(config_path, 'w') as f:
+        with open(temp_path, 'w') as f:
             json.dump(config, f, indent=4)
+        os.replace(temp_path, config_path)
     except IOError as e:
         console.print(f"[yellow]WARNING:[/] Could not save config file: {e}")
 
@@ -160,82 +221,372 @@ def get_base_path():
         return os.path.dirname(sys.executable)
     return os.path.dirname(os.path.abspath(__file__))
 
-# --- Caching & API Functions ---
-def load_cache():
-    cache_path = os.path.join(get_base_path(), CACHE_FILE)
-    if not os.path.exists(cache_path):
-        return {}
+# --- State Store ---
+# The API cache, last build info and asset store index live in one SQLite database,
+# one row per top-level key. Writes are row-level upserts inside BEGIN IMMEDIATE transactions, so concurrent
+# HATSKit processes serialize on the write lock instead of clobbering each other's files.
+def connect_state_db():
+    conn = sqlite3.connect(os.path.join(get_base_path(), STATE_DB_FILE), timeout=STATE_DB_TIMEOUT,
+                           isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('CREATE TABLE IF NOT EXISTS state ('
+                 'namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, '
+                 'PRIMARY KEY (namespace, key))')
+    return conn
+
+def migrate_json_state(conn, namespace, filename, section=None):
+    # One-time import of the JSON file (or one section of it) that held this namespace
+    # before the database.
+    marker = f"migrated:{namespace}"
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        if conn.execute("SELECT 1 FROM state WHERE namespace = 'meta' AND key = ?", (marker,)).fetchone() is None:
+            data = {}
+            json_path = os.path.join(get_base_path(), filename)
+            if os.path.exists(json_path):
+                try:
+                    with open(json_path, 'r') as f:
+                        data = json.load(f)
+                except (json.JSONDecodeError, IOError):
+                    data = {}
+            if section and isinstance(data, dict):
+                data = data.get(section, {})
+            if isinstance(data, dict):
+                conn.executemany('INSERT OR IGNORE INTO state (namespace, key, value) VALUES (?, ?, ?)',
+                                 [(namespace, key, json.dumps(value, sort_keys=True)) for key, value in data.items()])
+            conn.execute("INSERT INTO state (namespace, key, value) VALUES ('meta', ?, 'true')", (marker,))
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+def load_state(namespace, filename, section=None):
     try:
-        with open(cache_path, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
+        conn = connect_state_db()
+        try:
+            migrate_json_state(conn, namespace, filename, section)
+            rows = conn.execute('SELECT key, value FROM state WHERE namespace = ?', (namespace,)).fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        console.print(f"[yellow]WARNING:[/] Could not read {STATE_DB_FILE}: {e}")
         return {}
+    data = {}
+    with state_snapshot_lock:
+        for key, value in rows:
+            try:
+                data[key] = json.loads(value)
+            except ValueError:
+                continue
+            state_snapshot[(namespace, key)] = value
+    return data
+
+def save_state(namespace, data, replace=False):
+    # Only rows that differ from what this process last read or wrote are written.
+    # Without replace, keys this process never saw are left alone, so entries saved by
+    # another process in the meantime survive.
+    rows = {key: json.dumps(value, sort_keys=True) for key, value in data.items()}
+    with state_snapshot_lock:
+        changed = [(namespace, key, value) for key, value in rows.items()
+                   if state_snapshot.get((namespace, key)) != value]
+        removed = {key for ns, key in state_snapshot if ns == namespace and key not in rows}
+    conn = connect_state_db()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if replace:
+                existing = conn.execute('SELECT key FROM state WHERE namespace = ?', (namespace,)).fetchall()
+                removed |= {key for (key,) in existing if key not in rows}
+            conn.executemany('INSERT OR REPLACE INTO state (namespace, key, value) VALUES (?, ?, ?)', changed)
+            conn.executemany('DELETE FROM state WHERE namespace = ? AND key = ?', [(namespace, key) for key in removed])
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+    finally:
+        conn.close()
+    with state_snapshot_lock:
+        for _, key, value in changed:
+            state_snapshot[(namespace, key)] = value
+        for key in removed:
+            state_snapshot.pop((namespace, key), None)
+
+def update_state(namespace, data):
+    # Upserts just these rows, leaving the rest of the namespace alone.
+    rows = [(namespace, key, json.dumps(value, sort_keys=True)) for key, value in data.items()]
+    conn = connect_state_db()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany('INSERT OR REPLACE INTO state (namespace, key, value) VALUES (?, ?, ?)', rows)
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+    finally:
+        conn.close()
+    with state_snapshot_lock:
+        for _, key, value in rows:
+            state_snapshot[(namespace, key)] = value
+
+def clear_state(namespace):
+    conn = connect_state_db()
+    try:
+        cleared = conn.execute('DELETE FROM state WHERE namespace = ?', (namespace,)).rowcount
+    finally:
+        conn.close()
+    with state_snapshot_lock:
+        for key in [k for k in state_snapshot if k[0] == namespace]:
+            del state_snapshot[key]
+    return cleared
+
+# --- Caching & API Functions ---
+def load_cache():
+    # Listings used to be cached per component ('repo@tag|pattern'); those keys are
+    # never read again, so they are dropped instead of being kept forever.
+    cache = load_state('cache', CACHE_FILE)
+    obsolete = [key for key in cache if not key.startswith(CACHE_KEY_PREFIXES)]
+    if obsolete:
+        for key in obsolete:
+            del cache[key]
+        try:
+            save_state('cache', cache)
+        except sqlite3.Error as e:
+            console.print(f"[yellow]WARNING:[/] Could not prune old cache entries: {e}")
+    return cache
 
 def save_cache(cache):
-    cache_path = os.path.join(get_base_path(), CACHE_FILE)
+    # Background revalidation may still be writing entries.
+    with cache_lock:
+        cache = copy.deepcopy(cache)
     try:
-        with open(cache_path, 'w') as f:
-            json.dump(cache, f, indent=4)
-    except IOError as e:
-        console.print(f"  > [yellow]WARNING:[/] Could not save cache file: {e}")
+        save_state('cache', cache)
+    except sqlite3.Error as e:
+        console.print(f"  > [yellow]WARNING:[/] Could not save cache: {e}")
 
 def load_last_build():
-    last_build_path = os.path.join(get_base_path(), LAST_BUILD_FILE)
-    if not os.path.exists(last_build_path):
-        return {}
-    try:
-        with open(last_build_path, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        return {}
+    return load_state('last_build', LAST_BUILD_FILE)
 
 def save_last_build(build_info):
-    last_build_path = os.path.join(get_base_path(), LAST_BUILD_FILE)
     try:
-        with open(last_build_path, 'w') as f:
-            json.dump(build_info, f, indent=4)
-    except IOError as e:
+        save_state('last_build', build_info, replace=True)
+    except sqlite3.Error as e:
         console.print(f"  > [yellow]WARNING:[/] Could not save last build info: {e}")
 
-def clear_cache():
+def remove_cached_listings():
+    # Also drops a leftover pre-database cache file so it is not migrated back.
+    cleared = 0
+    try:
+        cleared = clear_state('cache')
+    except sqlite3.Error as e:
+        console.print(f"[bold red]ERROR:[/] Could not clear cache: {e}")
     cache_path = os.path.join(get_base_path(), CACHE_FILE)
     if os.path.exists(cache_path):
         try:
             os.remove(cache_path)
-            console.print(f"[yellow]Cache file '{CACHE_FILE}' cleared. Next builder run will fetch live data.[/]")
+            cleared += 1
         except OSError as e:
             console.print(f"[bold red]ERROR:[/] Could not clear cache file: {e}")
+    return cleared > 0
+
+def clear_cache():
+    if remove_cached_listings():
+        console.print(f"[yellow]Cache in '{STATE_DB_FILE}' cleared. Next builder run will fetch live data.[/]")
     else:
-        console.print(f"[yellow]No cache file found ('{CACHE_FILE}').[/]")
+        console.print(f"[yellow]No cached data found ('{STATE_DB_FILE}').[/]")
     questionary.press_any_key_to_continue(get_text("press_any_key"), style=custom_style).ask()
 
-def handle_rate_limit(response, repo):
-    if response.status_code in (403, 429) and "x-ratelimit-remaining" in response.headers and response.headers["x-ratelimit-remaining"] == "0":
-        reset_time = int(response.headers.get("x-ratelimit-reset", 0))
-        wait_time = max(reset_time - int(time.time()), 1)
-        console.print(f"\n  > [bold yellow]WARNING:[/] GitHub API rate limit exceeded for {repo}.")
-        console.print(f"    Please wait {wait_time} seconds to continue.")
-        time.sleep(wait_time + 1)
+# --- HTTP Client ---
+def get_http_session():
+    # One pooled session for all API and download traffic, so connections to each
+    # host are kept alive and reused across threads and redirects.
+    global http_session
+    with http_session_lock:
+        if http_session is None:
+            retry = Retry(
+                total=config.get('http_retries', HTTP_RETRIES),
+                backoff_factor=0.5,
+                status_forcelist=(500, 502, 503, 504),
+                allowed_methods=frozenset(['GET', 'HEAD', 'POST']),
+                raise_on_status=False,
+            )
+            pool_size = max(HTTP_POOL_SIZE, get_download_workers(), FETCH_WORKERS)
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=pool_size, max_retries=retry)
+            http_session = requests.Session()
+            http_session.mount('https://', adapter)
+            http_session.mount('http://', adapter)
+        return http_session
+
+def get_http_timeout():
+    return (config.get('http_connect_timeout', HTTP_CONNECT_TIMEOUT),
+            config.get('http_read_timeout', HTTP_READ_TIMEOUT))
+
+def http_request(method, url, **kwargs):
+    if args.offline:
+        raise requests.exceptions.ConnectionError(f"Offline mode: not fetching {url}")
+    kwargs.setdefault('timeout', get_http_timeout())
+    response = get_http_session().request(method, url, **kwargs)
+    record_rate_limit(response)
+    return response
+
+def http_get(url, **kwargs):
+    return http_request('GET', url, **kwargs)
+
+def get_connection_stats():
+    stats = {}
+    if http_session is None:
+        return stats
+    for adapter in set(http_session.adapters.values()):
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = stats.setdefault(pool.host, {'requests': 0, 'connections': 0})
+            host['requests'] += pool.num_requests
+            host['connections'] += pool.num_connections
+    return stats
+
+def print_connection_report():
+    for host, stats in sorted(get_connection_stats().items()):
+        reused = max(0, stats['requests'] - stats['connections'])
+        console.print(f"  > [dim]Connections to {host}: {stats['requests']} request(s) over "
+                      f"{stats['connections']} connection(s), {reused} reused[/]")
+
+# --- Rate Limit Budget ---
+def record_rate_limit(response):
+    remaining = response.headers.get('x-ratelimit-remaining')
+    if remaining is None:
+        return
+    resource = response.headers.get('x-ratelimit-resource', 'core')
+    try:
+        remaining = int(remaining)
+        reset = int(response.headers.get('x-ratelimit-reset', 0))
+        limit = int(response.headers.get('x-ratelimit-limit', 0))
+    except ValueError:
+        return
+    with rate_limit_lock:
+        budget = rate_limits.get(resource)
+        # Responses arrive out of order; within one window the lowest count is the current one.
+        if budget is None or reset > budget['reset']:
+            rate_limits[resource] = {'remaining': remaining, 'reset': reset, 'limit': limit}
+        elif reset == budget['reset']:
+            budget['remaining'] = min(budget['remaining'], remaining)
+            budget['limit'] = limit or budget['limit']
+
+def fetch_rate_limit(token):
+    # GET /rate_limit does not count against the limit, so the budget is known
+    # before the first metadata request is sent.
+    headers = {"Accept": "application/vnd.github.v3+json"}
+    if token:
+        headers["Authorization"] = f"token {token}"
+    try:
+        response = http_get("https://api.github.com/rate_limit", headers=headers)
+        response.raise_for_status()
+        resources = response.json().get('resources', {})
+    except (requests.exceptions.RequestException, ValueError):
+        return
+    with rate_limit_lock:
+        for resource in ('core', 'graphql'):
+            if resource in resources:
+                rate_limits[resource] = {key: int(resources[resource].get(key, 0)) for key in ('remaining', 'reset', 'limit')}
+
+def get_rate_limit_reserve():
+    try:
+        return max(0, int(config.get('rate_limit_reserve', RATE_LIMIT_RESERVE)))
+    except (TypeError, ValueError):
+        return RATE_LIMIT_RESERVE
+
+def reserve_api_request(resource='core'):
+    with rate_limit_lock:
+        budget = rate_limits.get(resource)
+        if budget is None:
+            return True
+        if budget['reset'] <= time.time():
+            del rate_limits[resource]
+            return True
+        if budget['remaining'] <= get_rate_limit_reserve():
+            return False
+        budget['remaining'] -= 1
         return True
-    return False
 
-def get_release_asset_info(component, token, cache):
-    repo = component.get('repo')
-    asset_pattern = component.get('asset_pattern')
-    tag = component.get('tag')
-    cache_key = f"{repo}@{tag or 'latest'}|{asset_pattern}"
+def refund_api_request(resource='core'):
+    # A conditional request answered with 304 is not counted by GitHub.
+    with rate_limit_lock:
+        budget = rate_limits.get(resource)
+        if budget is not None:
+            budget['remaining'] = min(budget['remaining'] + 1, budget['limit'] or budget['remaining'] + 1)
+
+def handle_rate_limit(response):
+    # The budget is already recorded as exhausted; callers fall back to cached
+    # metadata instead of sleeping until the reset.
+    return response.status_code in (403, 429) and response.headers.get("x-ratelimit-remaining") == "0"
+
+def set_listing_decision(listing_key, decision):
+    with cache_lock:
+        listing_report[listing_key] = decision
+
+def use_stale_listing(listing_key, cache):
+    listing = cache.get(listing_key)
+    set_listing_decision(listing_key, 'stale' if listing else 'skipped')
+    return listing
+
+def get_listing_ttl(component):
+    # A pinned tag names one immutable release, so its listing never expires unless
+    # the component sets its own cache_ttl_hours. None means no expiry. An invalid
+    # cache_ttl_hours falls back to the default TTL.
+    ttl_hours = component.get('cache_ttl_hours')
+    if ttl_hours is not None:
+        try:
+            if float(ttl_hours) >= 0:
+                return timedelta(hours=float(ttl_hours))
+        except (TypeError, ValueError, OverflowError):
+            pass
+        return CACHE_DURATION
+    if component.get('tag'):
+        return None
+    return CACHE_DURATION
+
+def is_listing_fresh(cache_entry, current_time, ttl=CACHE_DURATION):
+    cache_time = datetime.fromisoformat(cache_entry["timestamp"])
+    if cache_time.tzinfo is None:
+        cache_time = cache_time.replace(tzinfo=timezone.utc)
+    return ttl is None or current_time - cache_time < ttl
+
+def count_listing_use(cache_entry, outcome):
+    # Per-entry counters of how each lookup was served: 'hits' (fresh in cache),
+    # 'revalidations' (304 Not Modified) and 'misses' (downloaded again).
+    stats = cache_entry.setdefault('stats', {'hits': 0, 'revalidations': 0, 'misses': 0})
+    stats[outcome] = stats.get(outcome, 0) + 1
+
+def store_listing(cache, listing_key, listing):
+    # Caller holds cache_lock.
+    previous = cache.get(listing_key)
+    if previous and 'stats' in previous:
+        listing['stats'] = dict(previous['stats'])
+    count_listing_use(listing, 'misses')
+    cache[listing_key] = listing
+
+def get_listing_key(repo, tag):
+    return f"releases:{repo}@{tag or 'latest'}"
+
+def fetch_release_listing(repo, tag, token, cache, ttl=CACHE_DURATION):
+    listing_key = get_listing_key(repo, tag)
     current_time = datetime.now(timezone.utc)
 
-    if not args.clear_cache and cache_key in cache:
-        cache_entry = cache[cache_key]
+    if not args.clear_cache and listing_key in cache:
+        cache_entry = cache[listing_key]
         try:
-            cache_time = datetime.fromisoformat(cache_entry["timestamp"])
-            if cache_time.tzinfo is None:
-                cache_time = cache_time.replace(tzinfo=timezone.utc)
-            if current_time - cache_time < CACHE_DURATION:
+            if is_listing_fresh(cache_entry, current_time, ttl):
+                with cache_lock:
+                    count_listing_use(cache_entry, 'hits')
+                    listing_report[listing_key] = 'cached'
                 return cache_entry
-        except (ValueError, TypeError):
-            console.print(f"[yellow]WARNING:[/] Invalid cache timestamp for {cache_key}. Fetching fresh data.")
+        except (ValueError, TypeError, KeyError):
+            console.print(f"[yellow]WARNING:[/] Invalid cache timestamp for {listing_key}. Fetching fresh data.")
+
+    if not reserve_api_request():
+        return use_stale_listing(listing_key, cache)
 
     if tag:
         api_url = f"https://api.github.com/repos/{repo}/releases/tags/{tag}"
@@ -245,16 +596,24 @@ def get_release_asset_info(component, token, cache):
     headers = {"Accept": "application/vnd.github.v3+json"}
     if token:
         headers["Authorization"] = f"token {token}"
-    if cache_key in cache and "etag" in cache[cache_key]:
-        headers["If-None-Match"] = cache[cache_key]["etag"]
+    if listing_key in cache and cache[listing_key].get("etag"):
+        headers["If-None-Match"] = cache[listing_key]["etag"]
 
     try:
-        response = requests.get(api_url, headers=headers)
+        response = http_get(api_url, headers=headers)
         if response.status_code == 304:
-            return cache[cache_key]
-
-        if handle_rate_limit(response, repo):
-            return get_release_asset_info(component, token, cache)
+            # Not modified: the cached copy is confirmed current, so it is fresh again.
+            refund_api_request()
+            with cache_lock:
+                cache_entry = cache[listing_key]
+                cache_entry['timestamp'] = current_time.isoformat()
+                cache_entry['etag'] = response.headers.get("ETag", cache_entry.get('etag', ""))
+                count_listing_use(cache_entry, 'revalidations')
+                listing_report[listing_key] = 'not_modified'
+            return cache_entry
+
+        if handle_rate_limit(response):
+            return use_stale_listing(listing_key, cache)
 
         response.raise_for_status()
         release_data = response.json()
@@ -264,35 +623,804 @@ def get_release_asset_info(component, token, cache):
                 return None
             release_data = release_data[0]
 
-        for asset in release_data.get('assets', []):
-            if fnmatch(asset['name'], asset_pattern):
-                asset_info = {
-                    "url": asset['browser_download_url'],
-                    "version": release_data.get('tag_name', 'N/A'),
-                    "timestamp": current_time.isoformat(),
-                    "etag": response.headers.get("ETag", "")
-                }
-                cache[cache_key] = asset_info
-                return asset_info
-        return None
+        # Only what asset matching needs is kept, so the cache stays small.
+        listing = {
+            "version": release_data.get('tag_name', 'N/A'),
+            "assets": [{"name": a['name'], "url": a['browser_download_url'], "size": a.get('size')}
+                       for a in release_data.get('assets', [])],
+            "timestamp": current_time.isoformat(),
+            "etag": response.headers.get("ETag", "")
+        }
+        with cache_lock:
+            store_listing(cache, listing_key, listing)
+            listing_report[listing_key] = 'fetched'
+        return listing
     except requests.exceptions.RequestException:
+        set_listing_decision(listing_key, 'failed')
+        return None
+
+def get_release_listing(repo, tag, token, cache, ttl=CACHE_DURATION):
+    # Components sharing a repo/tag wait on the first request for it instead of
+    # issuing their own, so each listing is fetched at most once per run.
+    listing_key = get_listing_key(repo, tag)
+    with cache_lock:
+        future = listing_requests.get(listing_key)
+        is_owner = future is None
+        if is_owner:
+            future = listing_requests[listing_key] = Future()
+    if not is_owner:
+        return future.result()
+    try:
+        listing = fetch_release_listing(repo, tag, token, cache, ttl)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    future.set_result(listing)
+    return listing
+
+# --- GraphQL Release Resolution ---
+GRAPHQL_RELEASE_FIELDS = "tagName releaseAssets(first: 100) { nodes { name downloadUrl size } }"
+
+def use_graphql_resolver(token):
+    return bool(token) and (args.graphql or config.get('resolver') == 'graphql')
+
+def get_graphql_url():
+    # Overridable so the resolver can be pointed at a local fake endpoint.
+    return os.environ.get('HATSKIT_GRAPHQL_URL') or config.get('graphql_url') or GITHUB_GRAPHQL_URL
+
+def is_graphql_repo(repo):
+    parts = repo.split('/') if isinstance(repo, str) else []
+    return len(parts) == 2 and all(parts)
+
+def build_graphql_query(repo_tags):
+    fields = []
+    for i, (repo, tag) in enumerate(repo_tags):
+        owner, name = repo.split('/', 1)
+        if tag:
+            selection = f"release(tagName: {json.dumps(str(tag))}) {{ {GRAPHQL_RELEASE_FIELDS} }}"
+        else:
+            selection = f"releases(first: 1, orderBy: {{field: CREATED_AT, direction: DESC}}) {{ nodes {{ {GRAPHQL_RELEASE_FIELDS} }} }}"
+        fields.append(f"r{i}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)}) {{ {selection} }}")
+    return "query {\n  " + "\n  ".join(fields) + "\n}"
+
+def graphql_release_to_listing(release, current_time):
+    return {
+        "version": release.get('tagName') or 'N/A',
+        "assets": [{"name": a['name'], "url": a['downloadUrl'], "size": a.get('size')}
+                   for a in release.get('releaseAssets', {}).get('nodes', [])],
+        "timestamp": current_time.isoformat()
+    }
+
+def prefetch_listings_graphql(repo_tags, token, cache):
+    # Resolves many repo/tag listings per request and stores them exactly like the
+    # REST path does; anything missing from the response (or a repo that is not in
+    # owner/name form) falls back to REST.
+    repo_tags = [(repo, tag) for repo, tag in repo_tags if is_graphql_repo(repo)]
+    resolved = 0
+    for start in range(0, len(repo_tags), GRAPHQL_BATCH_SIZE):
+        batch = repo_tags[start:start + GRAPHQL_BATCH_SIZE]
+        if not reserve_api_request('graphql'):
+            return resolved
+        try:
+            response = http_request('POST', get_graphql_url(), json={"query": build_graphql_query(batch)},
+                                    headers={"Authorization": f"bearer {token}"})
+            response.raise_for_status()
+            data = response.json().get('data') or {}
+        except (requests.exceptions.RequestException, ValueError) as e:
+            console.print(f"[yellow]WARNING:[/] GraphQL release lookup failed, falling back to REST: {e}")
+            return resolved
+        current_time = datetime.now(timezone.utc)
+        for i, (repo, tag) in enumerate(batch):
+            repository = data.get(f"r{i}")
+            if not repository:
+                continue
+            if tag:
+                release = repository.get('release')
+            else:
+                nodes = (repository.get('releases') or {}).get('nodes') or []
+                release = nodes[0] if nodes else None
+            if not release:
+                continue
+            listing = graphql_release_to_listing(release, current_time)
+            future = Future()
+            future.set_result(listing)
+            with cache_lock:
+                store_listing(cache, get_listing_key(repo, tag), listing)
+                listing_requests[get_listing_key(repo, tag)] = future
+                listing_report[get_listing_key(repo, tag)] = 'graphql'
+            resolved += 1
+    return resolved
+
+def match_release_asset(listing, asset_pattern):
+    for asset in listing.get('assets', []):
+        if fnmatch(asset['name'], asset_pattern):
+            return {
+                "url": asset['url'],
+                "version": listing.get('version', 'N/A'),
+                "size": asset.get('size'),
+                "timestamp": listing.get('timestamp')
+            }
+    return None
+
+def get_release_asset_info(component, token, cache):
+    listing = get_release_listing(component.get('repo'), component.get('tag'), token, cache,
+                                  get_listing_ttl(component))
+    if not listing:
+        return None
+    return match_release_asset(listing, component.get('asset_pattern'))
+
+def needs_listing_request(component, cache, current_time):
+    cache_entry = cache.get(get_listing_key(component.get('repo'), component.get('tag')))
+    if args.clear_cache or not cache_entry:
+        return True
+    try:
+        return not is_listing_fresh(cache_entry, current_time, get_listing_ttl(component))
+    except (ValueError, TypeError, KeyError):
+        return True
+
+def is_listing_stale(component, cache, current_time):
+    cache_entry = cache.get(get_listing_key(component.get('repo'), component.get('tag')))
+    if args.clear_cache or not cache_entry:
+        return False
+    try:
+        return not is_listing_fresh(cache_entry, current_time, get_listing_ttl(component))
+    except (ValueError, TypeError, KeyError):
+        return False
+
+def use_stale_while_revalidate():
+    return config.get('stale_while_revalidate', True)
+
+def fetch_all_asset_info(all_components, token, cache, status, preferred=(), background=True):
+    # Returns the number of release listings used and a {future: component_id} map of
+    # background revalidations for components that were served from stale cache.
+    # With background=False stale listings are revalidated before returning.
+    github_components = {cid: c for cid, c in all_components.items() if c.get('source_type') == 'github_release'}
+    listing_requests.clear()
+    listing_report.clear()
+    direct_components = {cid: c for cid, c in all_components.items() if c.get('source_type') == 'direct_url'}
+    if direct_components:
+        resolve_direct_urls(all_components, direct_components, token, cache)
+    if not github_components:
+        return 0, {}
+    if args.offline:
+        return resolve_from_cache(all_components, github_components, cache), {}
+    current_time = datetime.now(timezone.utc)
+    # Likely selections go first so they get the remaining budget; within each group,
+    # listings with no cached copy to fall back on are fetched before stale ones.
+    github_components = dict(sorted(
+        github_components.items(),
+        key=lambda item: (item[0] not in preferred, get_listing_key(item[1].get('repo'), item[1].get('tag')) in cache)))
+    stale_components = {}
+    if background and use_stale_while_revalidate():
+        stale_components = {cid: c for cid, c in github_components.items() if is_listing_stale(c, cache, current_time)}
+        for component_id, component in stale_components.items():
+            del github_components[component_id]
+            asset_info = match_release_asset(cache[get_listing_key(component.get('repo'), component.get('tag'))],
+                                             component.get('asset_pattern'))
+            if asset_info:
+                all_components[component_id]['asset_info'] = asset_info
+    # Stale listings are revalidated in the background and learn the budget from
+    # response headers, so the menu never waits on this request.
+    if any(needs_listing_request(c, cache, current_time) for c in github_components.values()):
+        fetch_rate_limit(token)
+    if github_components:
+        fetch_listings_now(all_components, github_components, token, cache, status)
+    listing_keys = set(listing_requests) | {get_listing_key(c.get('repo'), c.get('tag')) for c in stale_components.values()}
+    pending = {}
+    if stale_components:
+        executor = ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(stale_components)))
+        pending = {executor.submit(get_release_asset_info, component, token, cache): component_id
+                   for component_id, component in stale_components.items()}
+        executor.shutdown(wait=False)
+    return len(listing_keys), pending
+
+def resolve_from_cache(all_components, github_components, cache):
+    # Offline: every cached listing is used whatever its age, and nothing is requested.
+    listing_keys = set()
+    for component_id, component in github_components.items():
+        listing_key = get_listing_key(component.get('repo'), component.get('tag'))
+        listing = cache.get(listing_key)
+        if not listing:
+            set_listing_decision(listing_key, 'missing')
+            continue
+        set_listing_decision(listing_key, 'cached')
+        listing_keys.add(listing_key)
+        asset_info = match_release_asset(listing, component.get('asset_pattern'))
+        if asset_info:
+            all_components[component_id]['asset_info'] = asset_info
+    return len(listing_keys)
+
+# --- Direct URL Sources ---
+def get_direct_url_key(url):
+    return f"direct:{url}"
+
+def get_header_version(etag, last_modified):
+    if last_modified:
+        try:
+            return parsedate_to_datetime(last_modified).strftime('%Y%m%d-%H%M%S')
+        except (TypeError, ValueError):
+            pass
+    if etag:
+        return f"etag-{hashlib.sha1(etag.encode('utf-8')).hexdigest()[:8]}"
+    return None
+
+def get_range_validator(etag, last_modified):
+    # If-Range only accepts a strong ETag or a date.
+    if etag and not etag.startswith('W/'):
+        return etag
+    return last_modified or None
+
+def direct_url_asset_info(url, cache_entry):
+    # A version of None means the server sent no validators and the file has not been
+    # downloaded since; resolve_pending_versions() versions it by content at build time.
+    asset_info = {
+        "url": url,
+        "version": cache_entry.get('version') or 'N/A',
+        "size": cache_entry.get('size'),
+        "timestamp": cache_entry.get('timestamp'),
+        "validator": get_range_validator(cache_entry.get('etag'), cache_entry.get('last_modified'))
+    }
+    if cache_entry.get('version') is None:
+        asset_info['pending'] = True
+    return asset_info
+
+def fetch_direct_url_info(component, token, cache):
+    # Validates the URL with a conditional HEAD (or a headers-only GET where HEAD is
+    # not allowed). The version comes from Last-Modified or the ETag; a server that
+    # sends neither leaves the version pending until a build downloads the file.
+    url = component.get('url')
+    if not url:
+        return None
+    cache_key = get_direct_url_key(url)
+    current_time = datetime.now(timezone.utc)
+    cache_entry = cache.get(cache_key)
+    if cache_entry:
+        try:
+            fresh = not args.clear_cache and is_listing_fresh(cache_entry, current_time, get_listing_ttl(component))
+        except (ValueError, TypeError, KeyError):
+            fresh = False
+        if fresh or args.offline:
+            with cache_lock:
+                count_listing_use(cache_entry, 'hits')
+            return direct_url_asset_info(url, cache_entry)
+    if args.offline:
         return None
 
-def download_file(url, download_path, token=None):
     headers = {}
     if token and "github.com" in url:
         headers["Authorization"] = f"token {token}"
-        headers["Accept"] = "application/octet-stream"
+    if cache_entry and cache_entry.get('etag'):
+        headers["If-None-Match"] = cache_entry['etag']
+    if cache_entry and cache_entry.get('last_modified'):
+        headers["If-Modified-Since"] = cache_entry['last_modified']
     try:
-        with requests.get(url, headers=headers, stream=True) as r:
-            r.raise_for_status()
-            with open(download_path, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
-        return True
+        response = http_request('HEAD', url, headers=headers, allow_redirects=True)
+        if response.status_code in (405, 501):
+            with http_get(url, headers=headers, stream=True) as response:
+                pass
+        if response.status_code == 304 and cache_entry:
+            with cache_lock:
+                cache_entry['timestamp'] = current_time.isoformat()
+                count_listing_use(cache_entry, 'revalidations')
+            return direct_url_asset_info(url, cache_entry)
+        response.raise_for_status()
     except requests.exceptions.RequestException as e:
-        console.print(f"  > [bold red]ERROR:[/] Failed to download {url}. {e}")
-        return False
+        console.print(f"[yellow]WARNING:[/] Could not check {url}: {e}")
+        return direct_url_asset_info(url, cache_entry) if cache_entry else None
+
+    etag = response.headers.get('ETag', '')
+    last_modified = response.headers.get('Last-Modified', '')
+    version = get_header_version(etag, last_modified)
+    size = response.headers.get('Content-Length')
+    entry = {
+        "version": version,
+        "size": int(size) if size and size.isdigit() else None,
+        "timestamp": current_time.isoformat(),
+        "etag": etag,
+        "last_modified": last_modified
+    }
+    with cache_lock:
+        store_listing(cache, cache_key, entry)
+    return direct_url_asset_info(url, entry)
+
+def resolve_direct_urls(all_components, direct_components, token, cache):
+    by_url = {}
+    for component_id, component in direct_components.items():
+        by_url.setdefault(component.get('url'), []).append(component_id)
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(by_url))) as executor:
+        futures = {executor.submit(fetch_direct_url_info, direct_components[component_ids[0]], token, cache): component_ids
+                   for component_ids in by_url.values()}
+        for future in as_completed(futures):
+            asset_info = future.result()
+            if asset_info:
+                for component_id in futures[future]:
+                    all_components[component_id]['asset_info'] = dict(asset_info)
+
+def resolve_pending_versions(user_choices, cache, token):
+    # Downloads the selected direct URLs whose version is pending and versions them by
+    # content; the download stage then finds them in the asset store. A file that
+    # cannot be fetched leaves its component without an asset, so it is skipped.
+    pending = {}
+    for component_id, component in user_choices.items():
+        asset_info = component.get('asset_info')
+        if asset_info and asset_info.get('pending'):
+            pending.setdefault(asset_info['url'], []).append(component_id)
+    if not pending or args.offline:
+        return
+    store = load_asset_store()
+    console.print(f"[dim]Fetching {len(pending)} file(s) without version headers to version them by content...[/]")
+    with ThreadPoolExecutor(max_workers=min(get_download_workers(), len(pending))) as executor:
+        futures = {executor.submit(store_asset, store, url, None, token): url for url in pending}
+        for future in as_completed(futures):
+            url = futures[future]
+            object_path = future.result()
+            if not object_path:
+                for component_id in pending[url]:
+                    user_choices[component_id].pop('asset_info', None)
+                continue
+            version = get_content_version(os.path.basename(object_path))
+            for component_id in pending[url]:
+                asset_info = user_choices[component_id]['asset_info']
+                asset_info['version'] = version
+                asset_info.pop('pending', None)
+            with cache_lock:
+                cache_entry = cache.get(get_direct_url_key(url))
+                if cache_entry and cache_entry.get('version') is None:
+                    cache_entry['version'] = version
+    save_asset_store(store)
+    save_cache(cache)
+
+def fetch_listings_now(all_components, github_components, token, cache, status):
+    total_components = len(github_components)
+    if use_graphql_resolver(token):
+        status.update(f"[bold green]{get_text('fetching_info')}[/]")
+        current_time = datetime.now(timezone.utc)
+        repo_tags = sorted({(c['repo'], c.get('tag')) for c in github_components.values()
+                            if c.get('repo') and needs_listing_request(c, cache, current_time)},
+                           key=lambda rt: (rt[0], str(rt[1])))
+        prefetch_listings_graphql(repo_tags, token, cache)
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, total_components)) as executor:
+        futures = {executor.submit(get_release_asset_info, component, token, cache): component_id
+                   for component_id, component in github_components.items()}
+        for i, future in enumerate(as_completed(futures)):
+            component_id = futures[future]
+            percent_done = int(((i + 1) / total_components) * 100)
+            status.update(f"[bold green]{get_text('fetching_progress', percent=percent_done, name=all_components[component_id]['name'])}[/]")
+            asset_info = future.result()
+            if asset_info:
+                all_components[component_id]['asset_info'] = asset_info
+
+def watch_revalidation(pending, all_components, choices, last_components, active_prompt):
+    # Refreshed versions are written into the menu's Choice objects, which the running
+    # checkbox prompt renders from, and the prompt is redrawn. all_components itself is
+    # only updated on the main thread, by apply_revalidation().
+    choice_by_id = {c.value: c for c in choices if isinstance(c, questionary.Choice)}
+
+    def on_revalidated(future):
+        component_id = pending[future]
+        try:
+            asset_info = future.result()
+        except Exception:
+            return
+        if not asset_info:
+            return
+        choice = choice_by_id.get(component_id)
+        if choice is not None:
+            refreshed = dict(all_components[component_id], asset_info=asset_info)
+            choice.title = get_component_choice_title(component_id, refreshed, last_components)
+        question = active_prompt.get('question')
+        if question is not None:
+            question.application.invalidate()
+
+    for future in pending:
+        future.add_done_callback(on_revalidated)
+
+def apply_revalidation(pending, all_components):
+    # Copies the results of finished revalidations into all_components.
+    for future, component_id in pending.items():
+        if not future.done():
+            continue
+        try:
+            asset_info = future.result()
+        except Exception:
+            continue
+        if asset_info:
+            all_components[component_id]['asset_info'] = asset_info
+
+def finish_revalidation(pending, cache, all_components):
+    if not pending:
+        return
+    with console.status("[bold green]Waiting for release info to finish refreshing...[/]"):
+        wait(pending)
+    apply_revalidation(pending, all_components)
+    save_cache(cache)
+    print_rate_limit_report(cache)
+
+def print_rate_limit_report(cache):
+    labels = [('fetched', 'fetched'), ('graphql', 'via GraphQL'), ('not_modified', 'not modified'),
+              ('cached', 'cached'), ('stale', 'stale (rate limited)'), ('skipped', 'skipped (rate limited)'),
+              ('failed', 'failed'), ('missing', 'not cached')]
+    decisions = list(listing_report.values())
+    counts = [f"{decisions.count(decision)} {label}" for decision, label in labels if decision in decisions]
+    if counts:
+        console.print(f"[dim]Release listings: {', '.join(counts)}.[/]")
+    budget = rate_limits.get('core')
+    if budget:
+        reset_at = datetime.fromtimestamp(budget['reset']).strftime('%H:%M')
+        console.print(f"[dim]GitHub API budget: {max(0, budget['remaining'])} of {budget['limit']} requests left, resets at {reset_at}.[/]")
+    for listing_key, decision in sorted(listing_report.items()):
+        name = listing_key.split(':', 1)[1]
+        if decision == 'stale':
+            console.print(f"[yellow]WARNING:[/] Rate limit reached, using cached release info for {name} "
+                          f"from {cache[listing_key]['timestamp'][:16].replace('T', ' ')}.")
+        elif decision == 'skipped':
+            console.print(f"[yellow]WARNING:[/] Rate limit reached, no release info available for {name}.")
+
+def get_download_chunk_size(total_size):
+    # About 64 reads per file, kept between 64 KiB and 1 MiB.
+    if not total_size:
+        return DOWNLOAD_CHUNK_MIN
+    return max(DOWNLOAD_CHUNK_MIN, min(DOWNLOAD_CHUNK_MAX, total_size // 64))
+
+def remove_part_file(download_path, keep_data=False):
+    for path in ([] if keep_data else [download_path]) + [download_path + DOWNLOAD_VALIDATOR_SUFFIX]:
+        if os.path.exists(path):
+            os.remove(path)
+
+def read_part_validator(download_path):
+    try:
+        with open(download_path + DOWNLOAD_VALIDATOR_SUFFIX, 'r') as f:
+            return f.read().strip() or None
+    except IOError:
+        return None
+
+def download_file(url, download_path, token=None, expected_size=None, validator=None):
+    # Appends to whatever an earlier attempt left in download_path using a Range
+    # request, and returns the SHA-256 of the complete file (hashed while it streams),
+    # or None on failure. A file that ends up the wrong size is deleted.
+    # The resumed request carries If-Range with the ETag/Last-Modified the partial file
+    # was fetched under (saved beside it), falling back to `validator`, so a file that
+    # changed on the server is sent whole instead of being spliced onto the old bytes.
+    # Without any validator a partial file is only resumed when the size is known.
+    headers = {}
+    if token and "github.com" in url:
+        headers["Authorization"] = f"token {token}"
+        headers["Accept"] = "application/octet-stream"
+    error = None
+    for attempt in range(DOWNLOAD_ATTEMPTS):
+        offset = os.path.getsize(download_path) if os.path.exists(download_path) else 0
+        range_validator = read_part_validator(download_path) or validator
+        if offset and ((expected_size is not None and offset > expected_size)
+                       or (expected_size is None and not range_validator)):
+            remove_part_file(download_path)
+            offset = 0
+        hasher = hashlib.sha256()
+        if offset:
+            with open(download_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_MAX), b''):
+                    hasher.update(chunk)
+        if expected_size is not None and offset == expected_size:
+            remove_part_file(download_path, keep_data=True)
+            return hasher.hexdigest()
+        request_headers = dict(headers)
+        if offset:
+            request_headers["Range"] = f"bytes={offset}-"
+            if range_validator:
+                request_headers["If-Range"] = range_validator
+        try:
+            with http_get(url, headers=request_headers, stream=True) as r:
+                if r.status_code == 416:
+                    remove_part_file(download_path)
+                    continue
+                r.raise_for_status()
+                mode = 'ab'
+                if offset and (r.status_code != 206 or not r.headers.get('Content-Range', '').startswith(f"bytes {offset}-")):
+                    # The server sent the whole file instead of the requested range.
+                    offset = 0
+                    hasher = hashlib.sha256()
+                if not offset:
+                    mode = 'wb'
+                    response_validator = get_range_validator(r.headers.get('ETag', ''), r.headers.get('Last-Modified', ''))
+                    if response_validator:
+                        with open(download_path + DOWNLOAD_VALIDATOR_SUFFIX, 'w') as f:
+                            f.write(response_validator)
+                    else:
+                        remove_part_file(download_path, keep_data=True)
+                content_length = r.headers.get('Content-Length')
+                total_size = expected_size or (offset + int(content_length) if content_length and content_length.isdigit() else None)
+                with open(download_path, mode) as f:
+                    for chunk in r.iter_content(chunk_size=get_download_chunk_size(total_size)):
+                        f.write(chunk)
+                        hasher.update(chunk)
+        except requests.exceptions.RequestException as e:
+            error = e
+            continue
+        size = os.path.getsize(download_path)
+        if expected_size is not None and size != expected_size:
+            console.print(f"  > [bold red]ERROR:[/] Download of {url} is {size} bytes, expected {expected_size}.")
+            remove_part_file(download_path)
+            return None
+        remove_part_file(download_path, keep_data=True)
+        return hasher.hexdigest()
+    console.print(f"  > [bold red]ERROR:[/] Failed to download {url}. {error}")
+    return None
+
+def get_assembly_mode(incremental):
+    # Incremental builds stream the pack from the manifest like the default mode;
+    # build/ is only kept up to date beside it as a mirror of the pack contents.
+    if incremental:
+        return 'stream'
+    return args.assembly or config.get('assembly', 'stream')
+
+def get_download_workers():
+    if args.workers:
+        return max(1, args.workers)
+    try:
+        return max(1, int(config.get('download_workers', DOWNLOAD_WORKERS)))
+    except (TypeError, ValueError):
+        return DOWNLOAD_WORKERS
+
+def submit_downloads(executor, user_choices, store, token):
+    # Components that resolve to the same asset share one lookup or download.
+    downloads = {}
+    by_key = {}
+    for component_id, component in user_choices.items():
+        asset_info = component.get("asset_info")
+        if asset_info and asset_info.get("url"):
+            url = asset_info["url"]
+            key = get_asset_key(url, asset_info.get('version'))
+            if key in by_key:
+                downloads[component_id] = by_key[key]
+                with asset_store_lock:
+                    store['stats']['shared'] += 1
+                    store['stats']['bytes_shared'] += asset_info.get('size') or 0
+                continue
+            cached_path = lookup_asset(store, url, asset_info.get('version'))
+            if cached_path:
+                console.print(f"  > [dim]Using cached asset: {os.path.basename(url).split('?')[0]} ({asset_info.get('version')})[/]")
+                future = Future()
+                future.set_result(cached_path)
+            else:
+                console.print(f"  > [dim]{get_text('downloading_from', url=url.split('?')[0])}[/]")
+                future = executor.submit(store_asset, store, url, asset_info.get('version'), token,
+                                         asset_info.get('size'), asset_info.get('validator'))
+            downloads[component_id] = by_key[key] = future
+    return downloads
+
+# --- Asset Store ---
+def get_asset_store_dir():
+    return os.path.join(get_base_path(), ASSET_STORE_DIR)
+
+# Which object each URL/version maps to, and each object's size and last use, are kept
+# in the state database ('asset_keys' and 'asset_objects'), so several HATSKit
+# processes can share one store. New objects and every lookup are recorded right away;
+# eviction runs inside a write transaction and never removes an object any process has
+# used within ASSET_EVICT_GRACE_SECONDS.
+def load_asset_store():
+    index_path = os.path.join(ASSET_STORE_DIR, ASSET_STORE_INDEX)
+    store = {'assets': load_state('asset_keys', index_path, 'assets'),
+             'objects': load_state('asset_objects', index_path, 'objects')}
+    store['stats'] = {'hits': 0, 'misses': 0, 'bytes_reused': 0, 'bytes_downloaded': 0, 'evicted': 0,
+                      'shared': 0, 'bytes_shared': 0}
+    store['used'] = set()
+    return store
+
+def save_asset_store(store):
+    with asset_store_lock:
+        assets = dict(store['assets'])
+        objects = copy.deepcopy(store['objects'])
+    try:
+        save_state('asset_keys', assets)
+        save_state('asset_objects', objects)
+    except sqlite3.Error as e:
+        console.print(f"  > [yellow]WARNING:[/] Could not save asset store index: {e}")
+
+def record_asset_use(digest, entry, key=None):
+    try:
+        update_state('asset_objects', {digest: entry})
+        if key:
+            update_state('asset_keys', {key: digest})
+    except sqlite3.Error as e:
+        console.print(f"  > [yellow]WARNING:[/] Could not record asset use: {e}")
+
+def get_asset_key(url, version):
+    return f"{url}|{version}"
+
+def get_object_path(digest):
+    return os.path.join(get_asset_store_dir(), 'objects', digest)
+
+def hash_file(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def get_stored_digest(store, url, version):
+    with asset_store_lock:
+        return store['assets'].get(get_asset_key(url, version))
+
+def has_stored_asset(store, url, version):
+    with asset_store_lock:
+        digest = store['assets'].get(get_asset_key(url, version))
+        entry = store['objects'].get(digest) if digest else None
+    return bool(entry) and os.path.isfile(get_object_path(digest)) and os.path.getsize(get_object_path(digest)) == entry['size']
+
+def find_missing_assets(user_choices, store):
+    missing = []
+    for comp_id, comp in sorted(user_choices.items()):
+        asset_info = comp.get('asset_info')
+        if not asset_info or not asset_info.get('url'):
+            if comp.get('source_type') == 'direct_url':
+                missing.append(f"{comp['name']} ({comp_id}): no cached info for {comp.get('url')}")
+            else:
+                tag = comp.get('tag') or 'latest'
+                missing.append(f"{comp['name']} ({comp_id}): no cached release info for {comp.get('repo')}@{tag}")
+        elif not has_stored_asset(store, asset_info['url'], asset_info.get('version')):
+            missing.append(f"{comp['name']} ({comp_id}): {os.path.basename(asset_info['url']).split('?')[0]} "
+                           f"({asset_info.get('version', 'N/A')}) is not in the asset store")
+    return missing
+
+def lookup_asset(store, url, version):
+    with asset_store_lock:
+        digest = store['assets'].get(get_asset_key(url, version))
+        entry = store['objects'].get(digest) if digest else None
+        if not entry:
+            return None
+        object_path = get_object_path(digest)
+        if not os.path.isfile(object_path) or os.path.getsize(object_path) != entry['size']:
+            return None
+        entry['last_used'] = datetime.now(timezone.utc).isoformat()
+        store['used'].add(digest)
+        touched = dict(entry)
+    # Checked again once the use is recorded: an eviction in another process has either
+    # seen it or already removed the file.
+    record_asset_use(digest, touched)
+    if not os.path.isfile(object_path):
+        return None
+    with asset_store_lock:
+        store['stats']['hits'] += 1
+        store['stats']['bytes_reused'] += entry['size']
+    return object_path
+
+def get_content_version(digest):
+    return f"sha256-{digest[:12]}"
+
+def claim_part_file(objects_dir, key):
+    # The part file is named after the asset key so a later run can resume it. A lock
+    # file stops two downloads appending to the same part; a lock older than
+    # DOWNLOAD_LOCK_STALE_SECONDS is taken to be left over from a crash.
+    base_path = os.path.join(objects_dir, hashlib.sha1(key.encode('utf-8')).hexdigest())
+    lock_path = f"{base_path}.lock"
+    for _ in range(2):
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return f"{base_path}.part", lock_path
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) < DOWNLOAD_LOCK_STALE_SECONDS:
+                    break
+                os.remove(lock_path)
+            except OSError:
+                pass
+    return f"{base_path}.{os.getpid()}.{threading.get_ident()}.part", None
+
+def store_asset(store, url, version, token, size=None, validator=None):
+    # version=None stores the asset under its content version (get_content_version),
+    # for sources that have no other way to tell versions apart.
+    key = get_asset_key(url, version)
+    objects_dir = os.path.join(get_asset_store_dir(), 'objects')
+    os.makedirs(objects_dir, exist_ok=True)
+    part_path, lock_path = claim_part_file(objects_dir, key)
+    try:
+        digest = download_file(url, part_path, token, size, validator)
+        if not digest:
+            # A shared part file is kept so the next attempt can resume it.
+            if lock_path is None:
+                remove_part_file(part_path)
+            return None
+        size = os.path.getsize(part_path)
+        object_path = get_object_path(digest)
+        os.replace(part_path, object_path)
+    finally:
+        if lock_path is not None:
+            os.remove(lock_path)
+    if version is None:
+        key = get_asset_key(url, get_content_version(digest))
+    entry = {
+        'size': size,
+        'name': os.path.basename(url).split('?')[0],
+        'last_used': datetime.now(timezone.utc).isoformat()
+    }
+    with asset_store_lock:
+        store['assets'][key] = digest
+        store['objects'][digest] = entry
+        store['stats']['misses'] += 1
+        store['stats']['bytes_downloaded'] += size
+        store['used'].add(digest)
+    record_asset_use(digest, dict(entry), key)
+    return object_path
+
+def get_asset_store_max_bytes():
+    try:
+        return int(config.get('asset_store_max_mb', ASSET_STORE_MAX_MB)) * 1024 * 1024
+    except (TypeError, ValueError):
+        return ASSET_STORE_MAX_MB * 1024 * 1024
+
+def evict_asset_store(store, max_bytes):
+    # Least recently used objects go first, judged from what every process has recorded.
+    # Anything used by the current build or by any build within ASSET_EVICT_GRACE_SECONDS
+    # is kept.
+    cutoff = (datetime.now(timezone.utc) - timedelta(seconds=ASSET_EVICT_GRACE_SECONDS)).isoformat()
+    evicted = []
+    try:
+        conn = connect_state_db()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                objects = {}
+                for digest, value in conn.execute("SELECT key, value FROM state WHERE namespace = 'asset_objects'"):
+                    try:
+                        objects[digest] = json.loads(value)
+                    except ValueError:
+                        continue
+                total_size = sum(entry.get('size', 0) for entry in objects.values())
+                for digest, entry in sorted(objects.items(), key=lambda item: item[1].get('last_used', '')):
+                    if total_size <= max_bytes:
+                        break
+                    if digest in store['used'] or entry.get('last_used', '') > cutoff:
+                        continue
+                    try:
+                        if os.path.exists(get_object_path(digest)):
+                            os.remove(get_object_path(digest))
+                        if os.path.exists(get_object_path(digest) + ARCHIVE_INDEX_SUFFIX):
+                            os.remove(get_object_path(digest) + ARCHIVE_INDEX_SUFFIX)
+                    except OSError:
+                        continue
+                    total_size -= entry.get('size', 0)
+                    evicted.append(digest)
+                conn.executemany("DELETE FROM state WHERE namespace = 'asset_objects' AND key = ?",
+                                 [(digest,) for digest in evicted])
+                conn.executemany("DELETE FROM state WHERE namespace = 'asset_keys' AND value = ?",
+                                 [(json.dumps(digest),) for digest in evicted])
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        console.print(f"  > [yellow]WARNING:[/] Could not evict from asset store: {e}")
+    evicted = set(evicted)
+    with asset_store_lock:
+        for digest in evicted:
+            store['objects'].pop(digest, None)
+        removed_keys = [key for key, digest in store['assets'].items() if digest in evicted]
+        for key in removed_keys:
+            del store['assets'][key]
+        store['stats']['evicted'] += len(evicted)
+    with state_snapshot_lock:
+        for digest in evicted:
+            state_snapshot.pop(('asset_objects', digest), None)
+        for key in removed_keys:
+            state_snapshot.pop(('asset_keys', key), None)
+
+def format_size(num_bytes):
+    if num_bytes < 1024:
+        return f"{num_bytes} B"
+    for unit in ['KB', 'MB', 'GB']:
+        num_bytes /= 1024
+        if num_bytes < 1024 or unit == 'GB':
+            return f"{num_bytes:.1f} {unit}"
+
+def print_asset_store_report(store):
+    stats = store['stats']
+    console.print(f"  > [dim]Asset cache: {stats['hits']} hit(s), {stats['misses']} miss(es), "
+                  f"{format_size(stats['bytes_reused'])} reused, {format_size(stats['bytes_downloaded'])} downloaded, "
+                  f"{stats['evicted']} evicted[/]")
+    if stats['shared']:
+        console.print(f"  > [dim]Shared assets: {stats['shared']} component(s) reused a file fetched for another "
+                      f"component ({format_size(stats['bytes_shared'])} not fetched twice)[/]")
 
 # --- Versioning Functions ---
 def compute_content_hash(user_choices):
@@ -303,97 +1431,582 @@ def compute_content_hash(user_choices):
         hasher.update(f"{comp_id}:{version}".encode('utf-8'))
     return hasher.hexdigest()[:7]
 
+FINGERPRINT_IGNORED_KEYS = {'descriptions', 'description', 'default', 'asset_info', 'cache_ttl_hours'}
+
+def compute_build_fingerprint(user_choices, store, skeleton_digest, custom_hekate_ini, settings):
+    # Covers every input that can change the pack: component definitions (steps,
+    # patterns, order), resolved assets, skeleton, generated files and pack settings.
+    # custom_hekate_ini=False leaves generated files out, for checks made before the
+    # hekate prompt.
+    components = []
+    for comp_id, comp in user_choices.items():
+        asset_info = comp.get('asset_info', {})
+        asset = {'url': asset_info.get('url'), 'version': asset_info.get('version', 'N/A')}
+        if asset['url']:
+            asset['sha256'] = get_stored_digest(store, asset['url'], asset['version'])
+        definition = {k: v for k, v in comp.items() if k not in FINGERPRINT_IGNORED_KEYS}
+        components.append([comp_id, definition, asset])
+    payload = {'builder': VERSION, 'components': components, 'skeleton': skeleton_digest, 'settings': settings}
+    if custom_hekate_ini is not False:
+        payload['generated'] = {HEKATE_INI_PATH: custom_hekate_ini}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+def get_pack_settings(incremental, reproducible):
+    settings = {'assembly': get_assembly_mode(incremental), 'compression_level': get_compression_level(), 'reproducible': bool(reproducible)}
+    if reproducible:
+        settings['zlib'] = zlib.ZLIB_VERSION
+    return settings
+
 # --- HATS Processing Logic ---
-def process_component(component, downloaded_file_path, build_dir):
+def to_build_relpath(path, build_dir):
+    return os.path.relpath(path, build_dir).replace(os.sep, '/')
+
+def run_build_pipeline(user_choices, store, token, workers, manifest):
+    # Downloads run concurrently, but components are applied to the manifest strictly
+    # in selection order so later steps overwrite/delete exactly as a sequential build would.
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        console.print(f"\n[bold]Downloading assets ({workers} parallel)...[/]")
+        downloads = submit_downloads(executor, user_choices, store, token)
+        for i, (component_id, component) in enumerate(user_choices.items(), 1):
+            console.print(f"\n-> [bold][{i}/{len(user_choices)}][/] [bold]{get_text('processing_component', name=component['name'])}[/]")
+            if component_id not in downloads:
+                console.print(f"  > [yellow]{get_text('skip_component')}[/]")
+                continue
+            console.print(f"  > [dim]{get_text('version', version=component['asset_info']['version'])}[/]")
+            download_path = downloads[component_id].result()
+            if download_path:
+                apply_component_to_manifest(component, download_path, manifest)
+
+# --- Build Directory (staged and incremental builds) ---
+def get_source_digest(path, digests):
+    # Asset store objects are already named by their SHA-256.
+    if path not in digests:
+        if os.path.dirname(os.path.abspath(path)) == os.path.abspath(os.path.join(get_asset_store_dir(), 'objects')):
+            digests[path] = os.path.basename(path)
+        else:
+            digests[path] = hash_file(path)
+    return digests[path]
+
+def get_manifest_signatures(manifest):
+    # One string per path that changes whenever the bytes written for it would.
+    digests = {}
+    signatures = {}
+    for path, entry in manifest.items():
+        if entry['type'] == 'zip':
+            signatures[path] = f"zip:{get_source_digest(entry['archive'], digests)}:{entry['member']}"
+        elif entry['type'] == 'file':
+            signatures[path] = f"file:{get_source_digest(entry['path'], digests)}"
+        elif entry['type'] == 'data':
+            signatures[path] = f"data:{hashlib.sha1(entry['data']).hexdigest()}"
+        else:
+            signatures[path] = 'dir'
+    return signatures
+
+def get_build_path(build_dir, path):
+    # The resolved target must stay inside build_dir (symlinks included); anything
+    # else is refused and None is returned.
+    root = os.path.realpath(build_dir)
+    target = os.path.realpath(os.path.join(root, *path.split('/')))
+    if target == root or os.path.commonpath([root, target]) != root:
+        console.print(f"  > [bold red]ERROR:[/] Refusing to write '{path}' outside the build directory.")
+        return None
+    return target
+
+def materialize_manifest(manifest, build_dir, previous=None):
+    # Writes the manifest out as a directory tree. `previous` holds the signatures of
+    # what build_dir already contains (from the last incremental build); only paths
+    # whose signature changed are written, and paths that are gone are removed.
+    # Every component is re-applied to the manifest, so when several components write
+    # the same path the diff already sees the final winner; no per-component overlap
+    # tracking is needed. Returns the signatures of the new tree.
+    signatures = get_manifest_signatures(manifest)
+    previous = previous or {}
+    dirs = manifest_dirs(manifest)
+    previous_dirs = manifest_dirs({path: {'type': 'dir' if sig == 'dir' else 'file'} for path, sig in previous.items()})
+
+    removed = 0
+    for path, sig in previous.items():
+        if sig != 'dir' and (path not in signatures or signatures[path] == 'dir'):
+            file_path = get_build_path(build_dir, path)
+            if file_path and os.path.isfile(file_path):
+                os.remove(file_path)
+                removed += 1
+    for path in sorted(previous_dirs - dirs, key=len, reverse=True):
+        dir_path = get_build_path(build_dir, path)
+        if dir_path and os.path.isdir(dir_path):
+            shutil.rmtree(dir_path)
+    for path in sorted(dirs):
+        dir_path = get_build_path(build_dir, path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+
+    changed = [path for path, entry in manifest.items() if entry['type'] != 'dir' and previous.get(path) != signatures[path]]
+    by_archive = {}
+    refused = 0
+    for path in changed:
+        entry = manifest[path]
+        target_path = get_build_path(build_dir, path)
+        if not target_path:
+            refused += 1
+            continue
+        if entry['type'] == 'zip':
+            by_archive.setdefault(entry['archive'], []).append((path, target_path))
+        elif entry['type'] == 'file':
+            shutil.copyfile(entry['path'], target_path)
+        else:
+            with open(target_path, 'wb') as f:
+                f.write(entry['data'])
+    for archive_path, paths in by_archive.items():
+        index = load_archive_index(archive_path)
+        with open(archive_path, 'rb') as src_fp:
+            for path, target_path in paths:
+                info = get_member_info(index, manifest[path]['member'])
+                with open(target_path, 'wb') as dst:
+                    if can_read_direct(info):
+                        for chunk in iter_member_content(src_fp, info):
+                            dst.write(chunk)
+                    else:
+                        dst.write(read_member(archive_path, info))
+
+    if previous:
+        unchanged = sum(1 for entry in manifest.values() if entry['type'] != 'dir') - len(changed)
+        console.print(f"-> [cyan]Incremental build: {len(changed) - refused} file(s) written, {removed} removed, {unchanged} unchanged.[/]")
+    return signatures
+
+# --- Pack Manifest (virtual build tree) ---
+# Every processing step is applied to the manifest, which maps each pack path to where
+# its bytes come from. Nothing touches disk until it is written once, either straight
+# into the pack or to build/:
+#   {'type': 'zip', 'archive': path, 'member': name}  member of a downloaded archive
+#   {'type': 'file', 'path': path}                     raw downloaded file
+#   {'type': 'data', 'data': bytes}                    generated content
+#   {'type': 'dir'}                                    explicit (possibly empty) folder
+def normalize_pack_path(path):
+    # Cleaned like ZipFile.extract() cleans member names: no drive prefix and no empty,
+    # '.' or '..' parts, so no path can point outside the pack root.
+    parts = [part for part in path.replace('\\', '/').split('/') if part not in ('', '.')]
+    if parts:
+        parts[0] = ntpath.splitdrive(parts[0])[1]
+    return '/'.join(part for part in parts if part not in ('', '.', '..'))
+
+def get_parent_dirs(path):
+    parts = path.split('/')[:-1]
+    return ['/'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+def manifest_dirs(manifest):
+    dirs = {p for p, e in manifest.items() if e['type'] == 'dir'}
+    for path in manifest:
+        dirs.update(get_parent_dirs(path))
+    return dirs
+
+# --- Archive Index ---
+# The central directory of each archive is parsed once: members are kept as
+# [name, header_offset, compress_size, file_size, CRC, compress_type, flag_bits,
+# date_time, external_attr] in archive order, plus a map from each top-level name
+# (after normalize_pack_path) to its members so find_and_* only walks what it moves. Asset store objects are named by
+# their content hash, so their index is saved next to them and reused by later builds.
+def get_archive_index_path(archive_path):
+    if os.path.dirname(os.path.abspath(archive_path)) == os.path.abspath(os.path.join(get_asset_store_dir(), 'objects')):
+        return archive_path + ARCHIVE_INDEX_SUFFIX
+    return None
+
+def build_archive_index(archive_path):
+    with zipfile.ZipFile(archive_path, 'r') as zf:
+        members = [[info.filename, info.header_offset, info.compress_size, info.file_size, info.CRC,
+                    info.compress_type, info.flag_bits, list(info.date_time), info.external_attr]
+                   for info in zf.infolist()]
+    roots = {}
+    for i, member in enumerate(members):
+        name = normalize_pack_path(member[0])
+        if name:
+            roots.setdefault(name.split('/')[0], []).append(i)
+    return {'version': ARCHIVE_INDEX_VERSION, 'members': members, 'roots': roots}
+
+def load_archive_index(archive_path):
+    stat = os.stat(archive_path)
+    key = (os.path.abspath(archive_path), stat.st_size, stat.st_mtime_ns)
+    with archive_index_lock:
+        if key in archive_indexes:
+            return archive_indexes[key]
+    index = None
+    index_path = get_archive_index_path(archive_path)
+    if index_path and os.path.exists(index_path):
+        try:
+            with open(index_path, 'r') as f:
+                index = json.load(f)
+            if index.get('version') != ARCHIVE_INDEX_VERSION:
+                index = None
+        except (json.JSONDecodeError, IOError, AttributeError):
+            index = None
+    if index is None:
+        index = build_archive_index(archive_path)
+        if index_path:
+            temp_path = f"{index_path}.{os.getpid()}.tmp"
+            try:
+                with open(temp_path, 'w') as f:
+                    json.dump(index, f)
+                os.replace(temp_path, index_path)
+            except OSError:
+                pass
+    index['names'] = {member[0]: i for i, member in enumerate(index['members'])}
+    with archive_index_lock:
+        archive_indexes[key] = index
+    return index
+
+def get_member_info(index, name):
+    filename, header_offset, compress_size, file_size, crc, compress_type, flag_bits, date_time, external_attr = \
+        index['members'][index['names'][name]]
+    info = zipfile.ZipInfo(filename, tuple(date_time))
+    info.header_offset = header_offset
+    info.compress_size = compress_size
+    info.file_size = file_size
+    info.CRC = crc
+    info.compress_type = compress_type
+    info.flag_bits = flag_bits
+    info.external_attr = external_attr
+    return info
+
+def can_read_direct(info):
+    return info.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED) and not info.flag_bits & 0x1
+
+def iter_member_content(src_fp, info):
+    # Uncompressed bytes of a stored or deflated member, read at its indexed offset
+    # without opening the archive's central directory, and checked against its CRC.
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS) if info.compress_type == zipfile.ZIP_DEFLATED else None
+    crc = 0
+    for chunk in iter_member_data(src_fp, info):
+        if decompressor:
+            chunk = decompressor.decompress(chunk)
+        crc = zlib.crc32(chunk, crc)
+        yield chunk
+    if decompressor:
+        chunk = decompressor.flush()
+        crc = zlib.crc32(chunk, crc)
+        yield chunk
+    if crc != info.CRC:
+        raise zipfile.BadZipFile(f"Bad CRC-32 for '{info.filename}'")
+
+def read_member(archive_path, info):
+    if can_read_direct(info):
+        with open(archive_path, 'rb') as f:
+            return b''.join(iter_member_content(f, info))
+    with zipfile.ZipFile(archive_path, 'r') as zf:
+        return zf.read(info.filename)
+
+def add_archive_to_manifest(manifest, archive_path, prefix=''):
+    # Returns the file paths it wrote.
+    added = []
+    for member in load_archive_index(archive_path)['members']:
+        name = normalize_pack_path(f"{prefix}/{normalize_pack_path(member[0])}")
+        if not name:
+            continue
+        if member[0].endswith('/'):
+            manifest.setdefault(name, {'type': 'dir'})
+        else:
+            manifest[name] = {'type': 'zip', 'archive': archive_path, 'member': member[0]}
+            added.append(name)
+    return added
+
+def match_manifest_paths(manifest, pattern):
+    # Mirrors glob.glob() on a real tree: '*' stays within one path segment and
+    # wildcards do not match hidden names unless the pattern asks for them.
+    pattern_parts = normalize_pack_path(pattern).split('/')
+    matches = []
+    for path in list(manifest) + sorted(manifest_dirs(manifest) - set(manifest)):
+        parts = path.split('/')
+        if len(parts) != len(pattern_parts):
+            continue
+        if all(fnmatch(part, pat) and not (part.startswith('.') and not pat.startswith('.') and any(c in pat for c in '*?['))
+               for part, pat in zip(parts, pattern_parts)):
+            matches.append(path)
+    return matches
+
+def remove_from_manifest(manifest, path):
+    # Deleting from a real tree leaves the parent folders behind, so keep them.
+    removed = [p for p in manifest if p == path or p.startswith(path + '/')]
+    for parent in get_parent_dirs(path):
+        manifest.setdefault(parent, {'type': 'dir'})
+    for p in removed:
+        del manifest[p]
+    return removed
+
+def apply_component_to_manifest(component, downloaded_file_path, manifest):
+    # The steps only edit the manifest, so whatever a later step deletes or overwrites
+    # is never extracted: the final manifest is the net set of members to write.
     console.print(f"  -> [cyan]{get_text('processing_component', name=component['name'])}[/]")
+    written = set()
+    dropped = set()
     for step in component.get('processing_steps', []):
         action = step.get('action')
         try:
             if action == 'unzip_to_root':
-                with zipfile.ZipFile(downloaded_file_path, 'r') as zf:
-                    zf.extractall(build_dir)
+                written.update(add_archive_to_manifest(manifest, downloaded_file_path))
                 console.print(f"     - {get_text('unzip_to_root')}")
             elif action == 'copy_file':
-                target_path_str = step['target_path'].strip('/\\')
-                target_path = os.path.join(build_dir, target_path_str)
-                os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                shutil.copy(downloaded_file_path, target_path)
+                manifest[normalize_pack_path(step['target_path'])] = {'type': 'file', 'path': downloaded_file_path}
+                written.add(normalize_pack_path(step['target_path']))
                 console.print(f"     - {get_text('copy_file', path=step['target_path'])}")
             elif action == 'unzip_folder':
-                target_dir = os.path.join(build_dir, step['target_path'].strip('/\\'))
-                os.makedirs(target_dir, exist_ok=True)
-                with zipfile.ZipFile(downloaded_file_path, 'r') as zf:
-                    zf.extractall(target_dir)
+                target_dir = normalize_pack_path(step['target_path'])
+                if target_dir:
+                    manifest.setdefault(target_dir, {'type': 'dir'})
+                written.update(add_archive_to_manifest(manifest, downloaded_file_path, prefix=target_dir))
                 console.print(f"     - {get_text('unzip_folder', path=step['target_path'])}")
             elif action in ['find_and_copy', 'find_and_rename']:
                 source_pattern = step['source_file_pattern']
-                target_dir = os.path.join(build_dir, step['target_path'].lstrip('/\\'))
-                os.makedirs(target_dir, exist_ok=True)
+                target_dir = normalize_pack_path(step['target_path'])
                 found = False
-                with zipfile.ZipFile(downloaded_file_path, 'r') as zf:
-                    root_items = sorted(list(set([m.split('/')[0] for m in zf.namelist()])))
-                    for item_name in root_items:
-                        if fnmatch(item_name, source_pattern):
-                            if action == 'find_and_rename':
-                                target_path = os.path.join(target_dir, step['target_filename'])
-                            else: # find_and_copy
-                                target_path = os.path.join(target_dir, item_name)
-                            
-                            temp_extract_dir = os.path.join(DOWNLOAD_DIR, 'temp_extract')
-                            if os.path.exists(temp_extract_dir): shutil.rmtree(temp_extract_dir)
-                            
-                            members_to_extract = [m for m in zf.namelist() if m.startswith(item_name)]
-                            zf.extractall(temp_extract_dir, members=members_to_extract)
-                            
-                            source_path = os.path.join(temp_extract_dir, item_name)
-                            shutil.move(source_path, target_path)
-                            
-                            if action == 'find_and_rename':
-                                console.print(f"     - Found and renamed '{item_name}' to '{step['target_filename']}'")
+                index = load_archive_index(downloaded_file_path)
+                for item_name in sorted(index['roots']):
+                    if fnmatch(item_name, source_pattern):
+                        target_name = step['target_filename'] if action == 'find_and_rename' else item_name
+                        target_path = normalize_pack_path(f"{target_dir}/{target_name}")
+                        if target_path in manifest_dirs(manifest):
+                            # shutil.move() into an existing folder nests the item inside it
+                            target_path = f"{target_path}/{item_name}"
+                        if target_dir:
+                            manifest.setdefault(target_dir, {'type': 'dir'})
+                        for i in index['roots'][item_name]:
+                            member = index['members'][i][0]
+                            name = normalize_pack_path(target_path + normalize_pack_path(member)[len(item_name):])
+                            if not name:
+                                continue
+                            if member.endswith('/'):
+                                manifest.setdefault(name, {'type': 'dir'})
                             else:
-                                console.print(f"     - Found and copied '{item_name}' to '{step['target_path']}'")
-                            
-                            found = True
-                            break
+                                manifest[name] = {'type': 'zip', 'archive': downloaded_file_path, 'member': member}
+                                written.add(name)
+
+                        if action == 'find_and_rename':
+                            console.print(f"     - Found and renamed '{item_name}' to '{step['target_filename']}'")
+                        else:
+                            console.print(f"     - Found and copied '{item_name}' to '{step['target_path']}'")
+                        found = True
+                        break
                 if not found:
                     console.print(f"     - [yellow]WARNING:[/] No file or folder matched pattern '{source_pattern}'")
             elif action == 'delete_file':
                 path_key = step.get('target_path', step.get('path', ''))
-                path_pattern = os.path.join(build_dir, path_key.lstrip('/\\'))
-                items_to_delete = glob.glob(path_pattern)
+                items_to_delete = match_manifest_paths(manifest, path_key)
                 if not items_to_delete:
                     console.print(f"     - [yellow]WARNING:[/] No file or folder matched path for deletion: '{path_key}'")
+                dirs = manifest_dirs(manifest)
                 for item in items_to_delete:
-                    if os.path.isfile(item):
-                        os.remove(item)
-                        console.print(f"     - {get_text('delete_file', filename=os.path.basename(item))}")
-                    elif os.path.isdir(item):
-                        shutil.rmtree(item)
+                    is_dir = item in dirs
+                    dropped.update(p for p in remove_from_manifest(manifest, item) if p in written)
+                    if is_dir:
                         console.print(f"     - Deleted folder: {os.path.basename(item)}")
+                    else:
+                        console.print(f"     - {get_text('delete_file', filename=os.path.basename(item))}")
         except Exception as e:
             console.print(f"     - [bold red]ERROR[/] Error processing step '{action}': {e}")
+    dropped = {p for p in dropped if p not in manifest}
+    if dropped:
+        console.print(f"     - [dim]{len(dropped)} file(s) removed by later steps were never extracted[/]")
+
+# --- Pack Writer ---
+# Deflated members are copied byte-for-byte (data, CRC and sizes) from their source
+# archive into the pack, so already-compressed data is never inflated and deflated again.
+# Everything else is deflated on a thread pool (zlib releases the GIL) and written back
+# in manifest order, so the archive layout does not depend on which worker finishes first.
+LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+LOCAL_HEADER_SIZE = 30
+DIR_EXTERNAL_ATTR = (0o40755 << 16) | 0x10
+FILE_EXTERNAL_ATTR = 0o100644 << 16
+ZIPFILE_RAW_ATTRS = ('_lock', '_writecheck', '_didModify', 'start_dir', 'NameToInfo', 'filelist', 'fp')
+
+def can_copy_raw(info):
+    return info.compress_type == zipfile.ZIP_DEFLATED and not info.flag_bits & 0x1
+
+def seek_member_data(src_fp, info):
+    src_fp.seek(info.header_offset)
+    header = src_fp.read(LOCAL_HEADER_SIZE)
+    if len(header) != LOCAL_HEADER_SIZE or header[:4] != LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile(f"Bad local file header for '{info.filename}'")
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    src_fp.seek(name_length + extra_length, os.SEEK_CUR)
+
+def read_file_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+def iter_member_data(src_fp, info):
+    seek_member_data(src_fp, info)
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = src_fp.read(min(remaining, 1024 * 1024))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated data for '{info.filename}'")
+        remaining -= len(chunk)
+        yield chunk
+
+def supports_raw_entries(out):
+    # write_raw_entry() works on ZipFile internals; a zipfile without them falls back
+    # to writestr(), which decompresses and recompresses every member.
+    return all(hasattr(out, name) for name in ZIPFILE_RAW_ATTRS)
+
+def write_raw_entry(out, zinfo, chunks):
+    # zinfo must already carry the CRC, sizes and compress_type of the data in chunks.
+    zinfo.flag_bits = 0
+    with out._lock:
+        out._writecheck(zinfo)
+        out._didModify = True
+        zinfo.header_offset = out.fp.tell()
+        zip64 = zinfo.file_size > zipfile.ZIP64_LIMIT or zinfo.compress_size > zipfile.ZIP64_LIMIT
+        out.fp.write(zinfo.FileHeader(zip64))
+        for chunk in chunks:
+            out.fp.write(chunk)
+        out.filelist.append(zinfo)
+        out.NameToInfo[zinfo.filename] = zinfo
+        out.start_dir = out.fp.tell()
+
+def deflate_data(read_data, level):
+    data = read_data()
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    compressed = compressor.compress(data) + compressor.flush()
+    return zlib.crc32(data), len(data), compressed
+
+def get_zip_workers():
+    if args.zip_workers:
+        return max(1, args.zip_workers)
+    try:
+        return max(1, int(config.get('zip_workers', os.cpu_count() or 1)))
+    except (TypeError, ValueError):
+        return os.cpu_count() or 1
 
-def create_final_zip(build_dir, output_filename):
+def get_compression_level():
+    level = args.compression_level if args.compression_level is not None else config.get('compression_level', COMPRESSION_LEVEL)
+    try:
+        return min(max(int(level), 0), 9)
+    except (TypeError, ValueError):
+        return COMPRESSION_LEVEL
+
+def manifest_from_directory(build_dir):
+    manifest = {}
+    for root, dirs, files in os.walk(build_dir):
+        dirs.sort()
+        rel_root = to_build_relpath(root, build_dir)
+        if rel_root != '.':
+            manifest[rel_root] = {'type': 'dir'}
+        for filename in sorted(files):
+            path = filename if rel_root == '.' else f"{rel_root}/{filename}"
+            manifest[path] = {'type': 'file', 'path': os.path.join(root, filename)}
+    return manifest
+
+def write_pack_zip(manifest, output_filename, workers=None, level=None, reproducible=False):
     console.print(f"\n[bold]{get_text('creating_zip')}[/]")
-    shutil.make_archive(output_filename.replace('.zip', ''), 'zip', build_dir)
+    workers = workers or get_zip_workers()
+    level = get_compression_level() if level is None else level
+    now = time.localtime()[:6]
+    emitted_dirs = set()
+    raw_files = {}
+    writer = {'raw': True}
+
+    def prepare(executor, path, entry):
+        # Returns (zinfo, chunks-or-future) for one entry; compression is started here.
+        if entry['type'] == 'dir':
+            zinfo = zipfile.ZipInfo(path + '/', now)
+            zinfo.external_attr = DIR_EXTERNAL_ATTR
+            zinfo.CRC = 0
+            return zinfo, []
+        if entry['type'] == 'zip':
+            src_info = get_member_info(load_archive_index(entry['archive']), entry['member'])
+            zinfo = zipfile.ZipInfo(path, src_info.date_time)
+            zinfo.external_attr = src_info.external_attr
+            if writer['raw'] and can_copy_raw(src_info):
+                if entry['archive'] not in raw_files:
+                    raw_files[entry['archive']] = open(entry['archive'], 'rb')
+                zinfo.compress_type = src_info.compress_type
+                zinfo.CRC = src_info.CRC
+                zinfo.compress_size = src_info.compress_size
+                zinfo.file_size = src_info.file_size
+                return zinfo, iter_member_data(raw_files[entry['archive']], src_info)
+            read_data = lambda: read_member(entry['archive'], src_info)
+        elif entry['type'] == 'file':
+            zinfo = zipfile.ZipInfo.from_file(entry['path'], path)
+            read_data = lambda: read_file_bytes(entry['path'])
+        else:
+            zinfo = zipfile.ZipInfo(path, now)
+            zinfo.external_attr = FILE_EXTERNAL_ATTR
+            read_data = lambda: entry['data']
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        if not writer['raw']:
+            return zinfo, executor.submit(read_data)
+        return zinfo, executor.submit(deflate_data, read_data, level)
+
+    def write(out, zinfo, payload):
+        if reproducible:
+            zinfo.date_time = REPRODUCIBLE_DATE_TIME
+            zinfo.create_system = 3
+            zinfo.external_attr = DIR_EXTERNAL_ATTR if zinfo.is_dir() else FILE_EXTERNAL_ATTR
+        if not writer['raw']:
+            out.writestr(zinfo, payload.result() if isinstance(payload, Future) else b''.join(payload), compresslevel=level)
+            return
+        if isinstance(payload, Future):
+            zinfo.CRC, zinfo.file_size, compressed = payload.result()
+            zinfo.compress_size = len(compressed)
+            payload = [compressed]
+        write_raw_entry(out, zinfo, payload)
+
+    try:
+        with zipfile.ZipFile(output_filename, 'w', zipfile.ZIP_DEFLATED) as out, \
+                ThreadPoolExecutor(max_workers=workers) as executor:
+            writer['raw'] = supports_raw_entries(out)
+            pending = deque()
+            for path, entry in (sorted(manifest.items()) if reproducible else manifest.items()):
+                # Like make_archive(), every folder gets its own entry ahead of its contents.
+                for parent in get_parent_dirs(path) + ([path] if entry['type'] == 'dir' else []):
+                    if parent not in emitted_dirs:
+                        emitted_dirs.add(parent)
+                        pending.append(prepare(executor, parent, {'type': 'dir'}))
+                if entry['type'] != 'dir':
+                    pending.append(prepare(executor, path, entry))
+                # Raw copies read the source archive directly, so flush them as soon as
+                # everything queued before them is done; keep a bounded compression window.
+                while pending and (not isinstance(pending[0][1], Future) or pending[0][1].done()
+                                   or len(pending) > workers * 4):
+                    write(out, *pending.popleft())
+            for zinfo, payload in pending:
+                write(out, zinfo, payload)
+    finally:
+        for raw_file in raw_files.values():
+            raw_file.close()
     console.print(f"[bold green]{get_text('zip_created', filename=output_filename)}[/]")
 
-def create_pack_summary(user_choices, categories, output_filename, script_version, content_hash, changes):
-    base_path = get_base_path()
-    build_dir = os.path.join(base_path, BUILD_DIR)
-    summary_filename = os.path.basename(output_filename).replace('.zip', '.txt')
-    summary_path = os.path.join(build_dir, summary_filename)
+def create_final_zip(build_dir, output_filename, reproducible=False):
+    write_pack_zip(manifest_from_directory(build_dir), output_filename, reproducible=reproducible)
+
+def reuse_reproducible_pack(last_build, fingerprint, output_path):
+    last_path = os.path.join(get_base_path(), last_build.get('filename', ''))
+    if last_build.get('fingerprint') != fingerprint or not os.path.isfile(last_path):
+        return False
+    if hash_file(last_path) != last_build.get('pack_sha256'):
+        return False
+    if os.path.abspath(last_path) != os.path.abspath(output_path):
+        shutil.copyfile(last_path, output_path)
+    console.print(f"\n[green]An identical pack was already built (SHA-256 {last_build['pack_sha256'][:12]}); reusing {last_build['filename']}.[/]")
+    return True
+
+
+def create_pack_summary(user_choices, categories, output_filename, script_version, content_hash, changes, manifest, reproducible=False):
+    # Reproducible packs leave out everything that differs between identical builds:
+    # the build date (also in the file name) and the changelog against the last build.
+    if reproducible:
+        summary_filename = f"{OUTPUT_FILENAME_BASE}-{content_hash}.txt"
+    else:
+        summary_filename = os.path.basename(output_filename).replace('.zip', '.txt')
     wib_time = datetime.now(timezone.utc) + timedelta(hours=7)
 
     content = []
     content.append("===================================")
     content.append(f"HATS Pack Summary (Builder v{script_version})")
     content.append("===================================")
-    content.append(f"\nGenerated on: {wib_time.strftime('%Y-%m-%d %H:%M:%S WIB')}")
+    if not reproducible:
+        content.append(f"\nGenerated on: {wib_time.strftime('%Y-%m-%d %H:%M:%S WIB')}")
     content.append(f"Builder Version: {script_version}")
     content.append(f"Content Hash: {content_hash}\n")
 
-    if changes:
+    if changes and not reproducible:
         content.append("--- CHANGELOG (What's New Since Last Build) ---")
         for change in changes:
             content.append(change)
@@ -409,12 +2022,9 @@ def create_pack_summary(user_choices, categories, output_filename, script_versio
                 content.append(f" - {comp['name']} ({version})")
             content.append("")
 
-    try:
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            f.write("\n".join(content))
-        console.print(f"[bold green]{get_text('summary_created', filename=summary_filename)}[/]")
-    except IOError as e:
-        console.print(f"[bold red]ERROR:[/] {get_text('summary_error', error=e)}")
+    manifest[summary_filename] = {'type': 'data', 'data': "\n".join(content).encode('utf-8')}
+    console.print(f"[bold green]{get_text('summary_created', filename=summary_filename)}[/]")
+    return summary_filename
 
 # --- JSON Editor Functions ---
 def load_components():
@@ -793,10 +2403,29 @@ def view_component_details(all_components, selected_ids):
     console.print(table)
     questionary.press_any_key_to_continue(get_text('press_any_key'), style=custom_style).ask()
 
+def get_component_choice_title(comp_id, comp, last_components):
+    version = comp.get('asset_info', {}).get('version', 'N/A')
+    description = get_component_description(comp, config.get('language', 'en'))
+    short_description = (description[:37] + '...') if len(description) > 40 else description
+
+    update_indicator = ""
+    last_comp_info = last_components.get(comp_id)
+    if last_comp_info:
+        last_version = None
+        # Handle both old format (string) and new format (dict) from last_build.json
+        if isinstance(last_comp_info, dict):
+            last_version = last_comp_info.get('version')
+        else:
+            last_version = last_comp_info
+
+        if last_version and version != 'N/A' and last_version != version:
+            update_indicator = " *NEW*"
+
+    return f"{comp['name']}{update_indicator} ({version}) - {short_description}"
+
 def run_builder():
     global github_pat, config
     base_path = get_base_path()
-    temp_download_path = os.path.join(base_path, DOWNLOAD_DIR)
     temp_build_path = os.path.join(base_path, BUILD_DIR)
     custom_hekate_ini = None
 
@@ -806,11 +2435,10 @@ def run_builder():
                                 style="bold blue", subtitle=get_text('builder_subtitle'),
                                 subtitle_align="right"))
 
-        if args.clear_cache and os.path.exists(os.path.join(base_path, CACHE_FILE)):
-            os.remove(os.path.join(base_path, CACHE_FILE))
-            console.print(f"[yellow]{get_text('cache_cleared', CACHE_FILE=CACHE_FILE)}[/]")
+        if args.clear_cache and remove_cached_listings():
+            console.print(f"[yellow]{get_text('cache_cleared', CACHE_FILE=STATE_DB_FILE)}[/]")
 
-        if github_pat is None:
+        if github_pat is None and not args.offline:
             console.print(f"[dim]{get_text('pat_info')}[/dim]")
             console.print(f"[dim]{get_text('pat_save_warning')}[/dim]")
             pat_input = questionary.password(
@@ -831,59 +2459,46 @@ def run_builder():
             return
 
         cache = load_cache()
+        last_build = load_last_build()
+        last_components = last_build.get('components', {})
+        preferred = {cid for cid, comp in all_components.items() if comp.get('default')} | set(last_components)
         with console.status(f"[bold green]{get_text('fetching_info')}[/]") as status:
-            total_components = len(all_components)
-            for i, (component_id, component) in enumerate(all_components.items()):
-                percent_done = int(((i + 1) / total_components) * 100)
-                status.update(f"[bold green]{get_text('fetching_progress', percent=percent_done, name=component['name'])}[/]")
-                if component.get('source_type') == 'github_release':
-                    asset_info = get_release_asset_info(component, github_pat, cache)
-                    if asset_info:
-                        all_components[component_id]['asset_info'] = asset_info
+            listing_count, pending = fetch_all_asset_info(all_components, github_pat, cache, status, preferred)
         save_cache(cache)
         console.print(f"✅ [bold green]{get_text('info_updated')}[/]")
+        console.print(f"[dim]Resolved {len(all_components)} components from {listing_count} release listings.[/]")
+        if pending:
+            console.print(f"[dim]Showing cached release info for {len(pending)} components while it refreshes in the background.[/]")
+        else:
+            print_rate_limit_report(cache)
 
         categories = sorted(list(set(all_components[c]['category'] for c in all_components)))
         choices = []
-        last_build = load_last_build()
-        last_components = last_build.get('components', {})
 
         for category in categories:
             choices.append(questionary.Separator(f"--- {category.upper()} ---"))
             components_in_category = {k: v for k, v in all_components.items() if v['category'] == category}
             for id, comp in sorted(components_in_category.items()):
-                version = comp.get('asset_info', {}).get('version', 'N/A')
-                description = get_component_description(comp, config.get('language', 'en'))
-                short_description = (description[:37] + '...') if len(description) > 40 else description
-                
-                update_indicator = ""
-                last_comp_info = last_components.get(id)
-                if last_comp_info:
-                    # *** FIXED CODE BLOCK STARTS HERE ***
-                    last_version = None
-                    # Handle both old format (string) and new format (dict) from last_build.json
-                    if isinstance(last_comp_info, dict):
-                        last_version = last_comp_info.get('version')
-                    else:
-                        last_version = last_comp_info
-                    # *** FIXED CODE BLOCK ENDS HERE ***
+                title = get_component_choice_title(id, comp, last_components)
+                choices.append(questionary.Choice(title=title, value=id, checked=comp.get('default', False)))
 
-                    if last_version and version != 'N/A' and last_version != version:
-                        update_indicator = " *NEW*"
+        active_prompt = {'question': None}
+        watch_revalidation(pending, all_components, choices, last_components, active_prompt)
 
-                title = f"{comp['name']}{update_indicator} ({version}) - {short_description}"
-                choices.append(questionary.Choice(title=title, value=id, checked=comp.get('default', False)))
-            
         while True:
-            selected_ids = questionary.checkbox(
+            question = questionary.checkbox(
                 get_text('select_components'),
                 choices=choices,
                 style=custom_style,
                 instruction=get_text('select_instruction'),
                 validate=lambda s: True if s else get_text('select_error')
-            ).ask()
+            )
+            active_prompt['question'] = question
+            selected_ids = question.ask()
+            active_prompt['question'] = None
 
             if selected_ids is None: # Handle Ctrl+C
+                finish_revalidation(pending, cache, all_components)
                 return
 
             # After selecting components, ask the user for the next action.
@@ -898,6 +2513,7 @@ def run_builder():
             ).ask()
 
             if next_action == "view":
+                apply_revalidation(pending, all_components)
                 view_component_details(all_components, selected_ids)
                 # Re-render the choices with current selections still checked
                 for choice in choices:
@@ -906,12 +2522,16 @@ def run_builder():
                 continue # Go back to the component selection prompt
             
             elif next_action == "return" or next_action is None:
+                finish_revalidation(pending, cache, all_components)
                 return # Exit the builder
             
             else: # "build"
                 break # Proceed to the build summary
 
+        finish_revalidation(pending, cache, all_components)
+
         user_choices = {id: all_components[id] for id in selected_ids if id not in ["view_details", "return_to_main"]}
+        resolve_pending_versions(user_choices, cache, github_pat)
 
         content_hash = compute_content_hash(user_choices)
         timestamp = datetime.now().strftime('%d%m%Y')
@@ -922,6 +2542,23 @@ def run_builder():
         last_components = last_build.get('components', {})
         changes = []
 
+        incremental = args.incremental or config.get('incremental_build', False)
+        reproducible = args.reproducible or config.get('reproducible_build', False)
+        pack_settings = get_pack_settings(incremental, reproducible)
+        skeleton_path = os.path.join(base_path, SKELETON_FILE)
+        skeleton_digest = hash_file(skeleton_path) if os.path.exists(skeleton_path) else None
+        store = load_asset_store()
+        if args.offline:
+            missing = find_missing_assets(user_choices, store)
+            if missing:
+                console.print(f"[bold red]ERROR:[/] Offline build needs {len(missing)} asset(s) that are not available locally:")
+                for line in missing:
+                    console.print(f"  - {line}")
+                console.print("[dim]Run 'hatskit.py --prefetch' with this selection on a connected machine first.[/]")
+                questionary.press_any_key_to_continue(get_text("press_any_key"), style=custom_style).ask()
+                return
+        inputs_fingerprint = compute_build_fingerprint(user_choices, store, skeleton_digest, False, pack_settings)
+
         for comp_id, comp_data in sorted(user_choices.items()):
             current_version = comp_data.get('asset_info', {}).get('version', 'N/A')
             last_comp_info = last_components.get(comp_id)
@@ -943,7 +2580,7 @@ def run_builder():
                 comp_version = last_comp_info.get('version') if isinstance(last_comp_info, dict) else last_comp_info
                 changes.append(f"* {comp_name}: Removed (was {comp_version})")
 
-        if not changes and last_build.get('content_hash') == content_hash:
+        if not changes and last_build.get('inputs_fingerprint') == inputs_fingerprint and not args.skip_unchanged:
                 last_filename = last_build.get('filename')
                 if last_filename and os.path.exists(os.path.join(base_path, last_filename)):
                     console.print(f"[yellow]{get_text('no_updates', filename=last_filename)}[/]")
@@ -1022,52 +2659,60 @@ def run_builder():
                         ini_content += ini_entries[entry_key] + '\n'
                 custom_hekate_ini = ini_content.strip()
 
-        if os.path.exists(temp_download_path): shutil.rmtree(temp_download_path)
-        if os.path.exists(temp_build_path): shutil.rmtree(temp_build_path)
-        os.makedirs(temp_download_path)
-        os.makedirs(temp_build_path)
+        fingerprint = compute_build_fingerprint(user_choices, store, skeleton_digest, custom_hekate_ini, pack_settings)
+        last_pack_exists = os.path.isfile(os.path.join(base_path, last_build.get('filename', '')))
+
+        if args.skip_unchanged and last_build.get('fingerprint') == fingerprint and last_pack_exists:
+            console.print(f"[yellow]{get_text('no_updates', filename=last_build['filename'])}[/]")
+            console.print(f"[yellow]{get_text('build_skipped')}[/]")
+            return
+        if reproducible and reuse_reproducible_pack(last_build, fingerprint, output_path):
+            save_last_build(dict(last_build, filename=output_filename, timestamp=timestamp))
+            console.print(Panel(f"[bold green]{get_text('build_complete')}[/]", subtitle=f"{get_text('output_location', path=output_path)}"))
+            questionary.press_any_key_to_continue(get_text('press_any_key'), style=custom_style).ask()
+            return
 
+        manifest = {}
         try:
             console.print(f"\n[bold]{get_text('starting_build')}[/]")
-            skeleton_path = os.path.join(base_path, SKELETON_FILE)
             console.print(f"-> [cyan]{get_text('processing_skeleton', filename=SKELETON_FILE)}[/]")
-            with zipfile.ZipFile(skeleton_path, 'r') as zf:
-                zf.extractall(temp_build_path)
+            add_archive_to_manifest(manifest, skeleton_path)
             console.print(f"  > [green]{get_text('skeleton_extracted')}[/]")
-            
-            if custom_hekate_ini:
-                hekate_ini_path = os.path.join(temp_build_path, 'bootloader', 'hekate_ipl.ini')
-                os.makedirs(os.path.dirname(hekate_ini_path), exist_ok=True)
-                with open(hekate_ini_path, 'w', encoding='utf-8') as f:
-                    f.write(custom_hekate_ini)
-                console.print(f"  > [green]{get_text('hekate_generated')}[/]")
-                
         except FileNotFoundError:
             console.print(f"[bold red]ERROR:[/] {get_text('skeleton_not_found', filename=SKELETON_FILE)}")
             return
-
-        i = 0
-        for component_id, component in user_choices.items():
-            i += 1
-            console.print(f"\n-> [bold][{i}/{len(user_choices)}][/] [bold]{get_text('processing_component', name=component['name'])}[/]")
-            asset_info = component.get("asset_info")
-            if asset_info and asset_info.get("url"):
-                download_url = asset_info["url"]
-                console.print(f"  > [dim]{get_text('version', version=asset_info['version'])}[/]")
-                filename = component_id + '_' + os.path.basename(download_url).split('?')[0]
-                download_path = os.path.join(temp_download_path, filename)
-                console.print(f"  > [dim]{get_text('downloading_from', url=download_url.split('?')[0])}[/]")
-                if download_file(download_url, download_path, github_pat):
-                    process_component(component, download_path, temp_build_path)
-            else:
-                console.print(f"  > [yellow]{get_text('skip_component')}[/]")
-
-        create_pack_summary(user_choices, categories, output_filename, VERSION, content_hash, changes)
-        create_final_zip(temp_build_path, output_path)
+        if custom_hekate_ini:
+            manifest[HEKATE_INI_PATH] = {'type': 'data', 'data': custom_hekate_ini.encode('utf-8')}
+            console.print(f"  > [green]{get_text('hekate_generated')}[/]")
+        run_build_pipeline(user_choices, store, github_pat, get_download_workers(), manifest)
+
+        summary_filename = create_pack_summary(user_choices, categories, output_filename, VERSION, content_hash, changes,
+                                               manifest, reproducible=reproducible)
+        tree = None
+        if incremental or get_assembly_mode(incremental) == 'staged':
+            # An incremental build only rewrites what changed since the tree recorded
+            # in last_build; anything else starts from an empty build directory.
+            previous_tree = last_build.get('tree') if incremental and os.path.isdir(temp_build_path) else None
+            if previous_tree is None:
+                if os.path.exists(temp_build_path): shutil.rmtree(temp_build_path)
+                os.makedirs(temp_build_path)
+            tree = materialize_manifest(manifest, temp_build_path, previous_tree)
+        if get_assembly_mode(incremental) == 'stream':
+            write_pack_zip(manifest, output_path, reproducible=reproducible)
+        else:
+            create_final_zip(temp_build_path, output_path, reproducible=reproducible)
+        pack_sha256 = hash_file(output_path)
+        console.print(f"  > [dim]SHA-256: {pack_sha256}[/]")
+        evict_asset_store(store, get_asset_store_max_bytes())
+        save_asset_store(store)
+        print_asset_store_report(store)
+        print_connection_report()
 
         new_build_info = {
             'content_hash': content_hash,
             'filename': output_filename,
+            'summary': summary_filename,
+            'pack_sha256': pack_sha256,
             'timestamp': timestamp,
             'components': {
                 comp_id: {
@@ -1076,10 +2721,14 @@ def run_builder():
                 } for comp_id, data in user_choices.items()
             }
         }
+        if incremental:
+            new_build_info['tree'] = tree
+        # Recomputed now that every asset's SHA-256 is known to the store.
+        new_build_info['fingerprint'] = compute_build_fingerprint(user_choices, store, skeleton_digest, custom_hekate_ini, pack_settings)
+        new_build_info['inputs_fingerprint'] = compute_build_fingerprint(user_choices, store, skeleton_digest, False, pack_settings)
         save_last_build(new_build_info)
 
-        if os.path.exists(temp_download_path): shutil.rmtree(temp_download_path)
-        if os.path.exists(temp_build_path): shutil.rmtree(temp_build_path)
+        if os.path.exists(temp_build_path) and not incremental: shutil.rmtree(temp_build_path)
         console.print(Panel(f"[bold green]{get_text('build_complete')}[/]", subtitle=f"{get_text('output_location', path=output_path)}"))
         questionary.press_any_key_to_continue(get_text('press_any_key'), style=custom_style).ask()
         return
@@ -1098,6 +2747,54 @@ def reset_pat():
     questionary.press_any_key_to_continue(get_text('press_any_key'), style=custom_style).ask()
 
 # --- Main Menu ---
+def get_prefetch_selection(all_components, last_build):
+    if args.prefetch.strip().lower() == 'all':
+        return dict(all_components)
+    if args.prefetch.strip():
+        ids = [comp_id.strip() for comp_id in args.prefetch.split(',') if comp_id.strip()]
+        unknown = [comp_id for comp_id in ids if comp_id not in all_components]
+        if unknown:
+            console.print(f"[bold red]ERROR:[/] Unknown component id(s): {', '.join(unknown)}")
+            return None
+        return {comp_id: all_components[comp_id] for comp_id in ids}
+    selected = {cid for cid, comp in all_components.items() if comp.get('default')} | set(last_build.get('components', {}))
+    return {comp_id: all_components[comp_id] for comp_id in sorted(selected) if comp_id in all_components}
+
+def run_prefetch():
+    # Fills the metadata cache and asset store so the same selection can later be
+    # built with --offline on a machine without network access.
+    all_components = load_components()
+    if all_components is None:
+        return 1
+    cache = load_cache()
+    last_build = load_last_build()
+    user_choices = get_prefetch_selection(all_components, last_build)
+    if user_choices is None:
+        return 1
+    with console.status(f"[bold green]{get_text('fetching_info')}[/]") as status:
+        # Synchronous: the assets downloaded below must match the listings being cached.
+        _, pending = fetch_all_asset_info(all_components, github_pat, cache, status, set(user_choices), background=False)
+    finish_revalidation(pending, cache, all_components)
+    resolve_pending_versions(user_choices, cache, github_pat)
+    save_cache(cache)
+
+    store = load_asset_store()
+    with ThreadPoolExecutor(max_workers=get_download_workers()) as executor:
+        downloads = submit_downloads(executor, user_choices, store, github_pat)
+        wait(downloads.values())
+    evict_asset_store(store, get_asset_store_max_bytes())
+    save_asset_store(store)
+    print_asset_store_report(store)
+
+    missing = find_missing_assets(user_choices, store)
+    if missing:
+        console.print(f"[bold red]ERROR:[/] {len(missing)} asset(s) could not be prefetched:")
+        for line in missing:
+            console.print(f"  - {line}")
+        return 1
+    console.print(f"✅ [bold green]Prefetched {len(user_choices)} component(s); they can now be built with --offline.[/]")
+    return 0
+
 def main():
     global config, github_pat
     config = load_config()
@@ -1108,6 +2805,8 @@ def main():
         config['language'] = lang_code
         save_config(config)
     load_language(lang_code)
+    if args.prefetch is not None:
+        sys.exit(run_prefetch())
     while True:
         os.system('cls' if os.name == 'nt' else 'clear')
         console.print(Panel(f"[bold white]{get_text('welcome_title', VERSION=VERSION)}[/]",